@@ -0,0 +1,272 @@
+import os
+import sqlite3
+import threading
+import hashlib
+import json
+import copy
+import zlib
+import time
+
+from api_client import request_priority, PRIORITY_BACKGROUND
+
+# SQLite file holding the cache (plus its -wal/-shm files while in use)
+api_cache_db = os.environ.get("TRAVEL_API_CACHE_DB", "api_cache.db")
+
+# Time-to-live in seconds per cached endpoint; anything else uses DEFAULT_TTL
+api_cache_ttls = {
+    "amadeus/flight-offers": 10 * 60,
+    "amadeus/hotels/by-city": 7 * 24 * 3600,
+    "amadeus/hotels/by-hotels": 7 * 24 * 3600,
+    "zoomcar/search-by-location": 15 * 60,
+    "zoomcar/car-by-id": 15 * 60,
+}
+DEFAULT_TTL = 5 * 60
+
+# Reference data served stale-while-revalidate: entries older than this are still
+# returned at once, and refreshed in the background for the next caller
+api_cache_soft_ttls = {
+    "amadeus/hotels/by-city": 6 * 3600,
+    "amadeus/hotels/by-hotels": 6 * 3600,
+}
+
+# Compressed bytes the cache may hold before least recently used entries are evicted
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+# Function to turn request parameters into a stable string, so equal requests share a key
+def canonical_params(params):
+    return json.dumps(params or {}, sort_keys=True, separators=(",", ":"), default=str)
+
+
+# Error responses and local fallback results are never stored
+def _cacheable(response):
+    return isinstance(response, dict) and "error" not in response and not response.get("fallback")
+
+
+class _Flight:
+    """One in-progress fetch and its outcome."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class ApiResponseCache:
+    """
+    Persistent cache of API responses in SQLite.
+
+    Entries are keyed by endpoint name and canonical request parameters and hold
+    the response as zlib-compressed JSON. Each endpoint has its own TTL
+    (api_cache_ttls). When the stored size goes over `max_bytes`, expired entries
+    go first and then the least recently used ones. Error responses and local
+    fallback results (marked "fallback") are never cached. Concurrent misses
+    for the same key share one fetch. Endpoints with a soft TTL
+    (api_cache_soft_ttls) serve entries past it immediately and refresh them on
+    a background thread.
+    """
+
+    def __init__(self, db_file=api_cache_db, max_bytes=DEFAULT_MAX_BYTES, ttls=None, soft_ttls=None):
+        self.db_file = db_file
+        self.max_bytes = max_bytes
+        self.ttls = dict(api_cache_ttls, **(ttls or {}))
+        self.soft_ttls = dict(api_cache_soft_ttls, **(soft_ttls or {}))
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS api_response_cache (
+                cache_key TEXT PRIMARY KEY,
+                endpoint TEXT,
+                params TEXT,
+                response BLOB,
+                size INTEGER,
+                created_at REAL,
+                expires_at REAL,
+                last_access REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_api_response_cache_lru ON api_response_cache (last_access)")
+        self._conn.commit()
+        self._stored_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM api_response_cache").fetchone()[0]
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "stores": 0,
+            "evictions": 0,
+            "bytes_read": 0,
+            "bytes_written": 0,
+            "bytes_served": 0,
+            "upstream_calls_saved": 0,
+            "stale_served": 0,
+            "refreshes": 0,
+            "refresh_failures": 0,
+        }
+        # In-flight fetches: cache_key -> _Flight shared by every caller waiting on it
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+
+    def _key(self, endpoint, params):
+        return hashlib.sha256(f"{endpoint}?{canonical_params(params)}".encode()).hexdigest()
+
+    # Return the cached response for (endpoint, params), or None on a miss or expired entry
+    def get(self, endpoint, params, refresh=None):
+        """If `refresh` is given, an entry past its soft TTL is refreshed with it in the background."""
+        entry = self._lookup(endpoint, params)
+        if entry is None:
+            return None
+        cached, created_at = entry
+        if refresh is not None:
+            self._revalidate(endpoint, params, created_at, refresh)
+        return cached
+
+    # Serve-stale bookkeeping: start a background refresh if the entry is past its endpoint's soft TTL
+    def _revalidate(self, endpoint, params, created_at, fetch):
+        soft_ttl = self.soft_ttls.get(endpoint)
+        if soft_ttl is not None and time.time() - created_at > soft_ttl:
+            with self._lock:
+                self._stats["stale_served"] += 1
+            self._refresh_in_background(endpoint, params, fetch)
+
+    # Return (response, created_at) for a live entry, or None
+    def _lookup(self, endpoint, params):
+        key = self._key(endpoint, params)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT response, expires_at, created_at FROM api_response_cache WHERE cache_key = ?", (key,)).fetchone()
+            if row is None or row[1] <= now:
+                self._stats["misses"] += 1
+                self._stats["expired"] += row is not None
+                return None
+            self._conn.execute("UPDATE api_response_cache SET last_access = ? WHERE cache_key = ?", (now, key))
+            self._conn.commit()
+            raw = zlib.decompress(row[0])
+            self._stats["hits"] += 1
+            self._stats["bytes_read"] += len(row[0])
+            self._stats["bytes_served"] += len(raw)
+        return json.loads(raw), row[2]
+
+    # Store a response under (endpoint, params) with the endpoint's TTL
+    def set(self, endpoint, params, response):
+        key = self._key(endpoint, params)
+        blob = zlib.compress(json.dumps(response, separators=(",", ":")).encode(), 6)
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM api_response_cache WHERE cache_key = ?", (key,)).fetchone()
+            self._conn.execute("""
+                INSERT OR REPLACE INTO api_response_cache (cache_key, endpoint, params, response, size, created_at, expires_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (key, endpoint, canonical_params(params), blob, len(blob), now, now + self.ttls.get(endpoint, DEFAULT_TTL), now))
+            self._stored_bytes += len(blob) - (old[0] if old else 0)
+            self._stats["stores"] += 1
+            self._stats["bytes_written"] += len(blob)
+            if self._stored_bytes > self.max_bytes:
+                self._evict(now)
+            self._conn.commit()
+
+    # Drop expired entries, then least recently used ones, until the cache fits its budget
+    def _evict(self, now):
+        self._stats["evictions"] += self._conn.execute("DELETE FROM api_response_cache WHERE expires_at <= ?", (now,)).rowcount
+        self._stored_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM api_response_cache").fetchone()[0]
+        for key, size in self._conn.execute("SELECT cache_key, size FROM api_response_cache ORDER BY last_access").fetchall():
+            if self._stored_bytes <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM api_response_cache WHERE cache_key = ?", (key,))
+            self._stored_bytes -= size
+            self._stats["evictions"] += 1
+
+    # Return the cached response, or call fetch() and cache its result unless it is an error
+    def get_or_fetch(self, endpoint, params, fetch):
+        """
+        Identical requests that miss at the same time are coalesced: the first
+        caller runs fetch() and the others wait for its result (errors included)
+        instead of calling the upstream themselves. Each waiter gets its own copy.
+        """
+        entry = self._lookup(endpoint, params)
+        if entry is not None:
+            cached, created_at = entry
+            self._revalidate(endpoint, params, created_at, fetch)
+            return cached
+
+        key = self._key(endpoint, params)
+        with self._inflight_lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+        if not leader:
+            flight.done.wait()
+            with self._lock:
+                self._stats["upstream_calls_saved"] += 1
+            if flight.error is not None:
+                raise flight.error
+            return copy.deepcopy(flight.result)
+
+        try:
+            response = fetch()
+            if _cacheable(response):
+                self.set(endpoint, params, response)
+            flight.result = copy.deepcopy(response)
+            return response
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+            flight.done.set()
+
+    # Start one background fetch for a stale entry unless one is already running for its key
+    def _refresh_in_background(self, endpoint, params, fetch):
+        key = self._key(endpoint, params)
+        with self._inflight_lock:
+            if key in self._inflight:
+                return
+            flight = self._inflight[key] = _Flight()
+
+        def refresh():
+            try:
+                with request_priority(PRIORITY_BACKGROUND):
+                    response = fetch()
+                if _cacheable(response):
+                    self.set(endpoint, params, response)
+                    stat = "refreshes"
+                else:
+                    # The stale entry stays in place until its hard TTL
+                    stat = "refresh_failures"
+                flight.result = copy.deepcopy(response)
+            except Exception as e:
+                flight.error = e
+                stat = "refresh_failures"
+            finally:
+                with self._inflight_lock:
+                    del self._inflight[key]
+                flight.done.set()
+            with self._lock:
+                self._stats[stat] += 1
+
+        threading.Thread(target=refresh, name=f"api-cache-refresh-{key[:8]}", daemon=True).start()
+
+    # Snapshot of the cache's counters, including how many bytes it currently holds
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = self._conn.execute("SELECT COUNT(*) FROM api_response_cache").fetchone()[0]
+        stats["stored_bytes"] = self._stored_bytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+# One cache per database file, shared by every session in the process
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+# Function to get the process-wide API response cache for a database file
+def get_api_cache(db_file=api_cache_db):
+    with _caches_lock:
+        if db_file not in _caches:
+            _caches[db_file] = ApiResponseCache(db_file)
+        return _caches[db_file]
@@ -0,0 +1,526 @@
+import os
+import heapq
+import itertools
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# (connect, read) timeouts in seconds for every upstream call, overridable from the environment
+DEFAULT_TIMEOUT = (
+    float(os.environ.get("TRAVEL_HTTP_CONNECT_TIMEOUT", 3.05)),
+    float(os.environ.get("TRAVEL_HTTP_READ_TIMEOUT", 15)),
+)
+
+# Threads shared by all concurrent upstream fan-outs in the process
+FAN_OUT_WORKERS = int(os.environ.get("TRAVEL_FAN_OUT_WORKERS", 8))
+
+# Methods that are safe to send again after a failure
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+# Responses worth retrying: throttling and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HttpClient:
+    """
+    One pooled keep-alive requests.Session per upstream host, shared by every
+    thread. Every request gets connect/read timeouts, so a hung upstream cannot
+    hold a Streamlit thread forever. Idempotent requests (or any request sent
+    with retry=True) are retried on connection errors, timeouts and
+    RETRY_STATUSES, waiting backoff * 2**attempt seconds with +/-50% jitter
+    (or the server's Retry-After), capped at max_backoff.
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, retries=3, backoff=0.5, max_backoff=8.0, pool_size=16):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.pool_size = pool_size
+        self._sessions = {}
+        self._sessions_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "retries": 0, "timeouts": 0, "connection_errors": 0, "sessions": 0}
+
+    # Get (or create) the pooled session for a URL's scheme and host
+    def session_for(self, url):
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+        with self._sessions_lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount(host, adapter)
+                self._sessions[host] = session
+                with self._stats_lock:
+                    self._stats["sessions"] += 1
+            return session
+
+    def _delay(self, attempt, response=None):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return min(self.max_backoff, float(retry_after))
+            except ValueError:
+                pass
+        return min(self.max_backoff, self.backoff * (2 ** attempt)) * random.uniform(0.5, 1.5)
+
+    def _count(self, key):
+        with self._stats_lock:
+            self._stats[key] += 1
+
+    # Send a request through the host's pooled session with timeouts and retries
+    def request(self, method, url, retry=None, before_attempt=None, **kwargs):
+        """
+        `before_attempt()`, if given, runs before every attempt including retries
+        (e.g. to take a rate limiter token); an exception from it ends the request.
+        """
+        method = method.upper()
+        kwargs.setdefault("timeout", self.timeout)
+        retry = method in IDEMPOTENT_METHODS if retry is None else retry
+        attempts = self.retries + 1 if retry else 1
+        session = self.session_for(url)
+
+        for attempt in range(attempts):
+            if before_attempt is not None:
+                before_attempt()
+            self._count("requests")
+            try:
+                response = session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self._count("timeouts" if isinstance(e, requests.exceptions.Timeout) else "connection_errors")
+                if attempt + 1 >= attempts:
+                    raise
+                delay = self._delay(attempt)
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt + 1 >= attempts:
+                    return response
+                delay = self._delay(attempt, response)
+                response.close()
+            self._count("retries")
+            time.sleep(delay)
+
+    # Longest one request can take when every attempt hits its timeouts and every backoff is at its longest
+    def max_request_seconds(self, retry=True):
+        connect, read = self.timeout if isinstance(self.timeout, tuple) else (self.timeout, self.timeout)
+        attempts = self.retries + 1 if retry else 1
+        backoffs = sum(max(self.max_backoff, 1.5 * min(self.max_backoff, self.backoff * 2 ** attempt)) for attempt in range(attempts - 1))
+        return attempts * (connect + read) + backoffs
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    # Snapshot of the client's counters
+    def stats(self):
+        with self._stats_lock:
+            return dict(self._stats)
+
+
+# Process-wide client used by all upstream calls
+http_client = HttpClient()
+
+
+_fan_out_pool = None
+_fan_out_lock = threading.Lock()
+
+
+def _get_fan_out_pool():
+    global _fan_out_pool
+    with _fan_out_lock:
+        if _fan_out_pool is None:
+            _fan_out_pool = ThreadPoolExecutor(max_workers=FAN_OUT_WORKERS, thread_name_prefix="fan-out")
+        return _fan_out_pool
+
+
+# Function to run one call per item concurrently and collect the results in item order
+def fan_out(func, items, deadline, default=None):
+    """
+    Runs func(item) for every item on a bounded process-wide thread pool and
+    returns the results in the same order as `items`. An item whose call raises,
+    or has not finished `deadline` seconds after the fan-out started, gets
+    `default` instead, so one slow or failing lookup never fails the others.
+    """
+    items = list(items)
+    futures = [_get_fan_out_pool().submit(func, item) for item in items]
+    wait(futures, timeout=deadline)
+    results = []
+    for future in futures:
+        if future.done() and not future.cancelled() and future.exception() is None:
+            results.append(future.result())
+        else:
+            future.cancel()
+            results.append(default)
+    return results
+
+
+class AmadeusAuthError(requests.exceptions.RequestException):
+    """Raised when no Amadeus access token could be obtained."""
+
+
+class TokenManager:
+    """
+    Caches an OAuth2 client-credentials token until `refresh_margin` seconds
+    before its expires_in. Concurrent callers that find no valid token share a
+    single refresh: one thread fetches while the others wait for its result.
+    invalidate() drops a token the API rejected (HTTP 401) so the next call
+    fetches a new one.
+    """
+
+    def __init__(self, token_url, client_id, client_secret, refresh_margin=60):
+        self.token_url = token_url
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.refresh_margin = refresh_margin
+        self._token = None
+        self._expires_at = 0.0
+        self._refresh_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "fetches": 0, "failures": 0, "invalidations": 0}
+
+    def _valid_token(self):
+        token = self._token
+        return token if token and time.monotonic() < self._expires_at else None
+
+    # Return a valid access token, fetching a new one only when needed; raises AmadeusAuthError
+    def get_token(self):
+        with self._stats_lock:
+            self._stats["requests"] += 1
+        token = self._valid_token()
+        if token:
+            return token
+
+        with self._refresh_lock:
+            # Another thread may have refreshed while this one waited
+            token = self._valid_token()
+            if token:
+                return token
+            return self._fetch()
+
+    def _fetch(self):
+        data = {
+            "grant_type": "client_credentials",
+            "client_id": self.client_id,
+            "client_secret": self.client_secret
+        }
+        with self._stats_lock:
+            self._stats["fetches"] += 1
+        try:
+            # Client-credentials grants can safely be requested again
+            response = http_client.post(self.token_url, data=data, retry=True)
+            response.raise_for_status()
+            payload = response.json()
+            token = payload["access_token"]
+        except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+            with self._stats_lock:
+                self._stats["failures"] += 1
+            raise AmadeusAuthError(f"Could not get an Amadeus access token: {e}") from e
+
+        expires_in = float(payload.get("expires_in", 0) or 0)
+        self._token = token
+        self._expires_at = time.monotonic() + max(0.0, expires_in - self.refresh_margin)
+        return token
+
+    # Whether a 401 from this URL means the token itself was rejected (same scheme and host as the token endpoint)
+    def issued_for(self, url):
+        token_url, request_url = urlsplit(self.token_url), urlsplit(url)
+        return (token_url.scheme, token_url.netloc) == (request_url.scheme, request_url.netloc)
+
+    # Forget the cached token (only if it is still the one that was rejected)
+    def invalidate(self, token=None):
+        with self._refresh_lock:
+            if token is None or token == self._token:
+                self._token = None
+                self._expires_at = 0.0
+                with self._stats_lock:
+                    self._stats["invalidations"] += 1
+
+    # Snapshot of the manager's counters; fetches_avoided is how many callers were served from cache
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["fetches_avoided"] = stats["requests"] - stats["fetches"]
+        stats["expires_in"] = max(0.0, self._expires_at - time.monotonic()) if self._token else 0.0
+        return stats
+
+
+# Priority classes for rate-limited calls; lower values are served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+# Seconds a call may queue for the rate limiter before it is rejected, per priority
+rate_limit_deadlines = {
+    PRIORITY_INTERACTIVE: 10.0,
+    PRIORITY_BACKGROUND: 30.0,
+}
+
+_priority = threading.local()
+
+
+# Context manager that sets the priority of the rate-limited calls made by this thread
+@contextmanager
+def request_priority(priority):
+    previous = getattr(_priority, "value", PRIORITY_INTERACTIVE)
+    _priority.value = priority
+    try:
+        yield
+    finally:
+        _priority.value = previous
+
+
+def current_priority():
+    return getattr(_priority, "value", PRIORITY_INTERACTIVE)
+
+
+class RateLimitExceeded(requests.exceptions.RequestException):
+    """Raised when a call could not get a rate limiter slot before its deadline."""
+
+
+# Seconds this thread has spent queued in rate limiters, so breakers can leave it out of call latency
+_limiter_wait = threading.local()
+
+
+def _add_limiter_wait(seconds):
+    _limiter_wait.seconds = limiter_wait_seconds() + seconds
+
+
+def limiter_wait_seconds():
+    return getattr(_limiter_wait, "seconds", 0.0)
+
+
+class RateLimiter:
+    """
+    Token bucket shared by every thread: `rate` calls per second on average with
+    bursts of up to `burst`. Callers that find the bucket empty queue by priority
+    (then arrival order) and wait for a token; one still waiting when its
+    deadline (rate_limit_deadlines) passes gets RateLimitExceeded.
+    """
+
+    def __init__(self, rate, burst=None, deadlines=None):
+        self.rate = float(rate)
+        self.burst = float(burst or max(1.0, rate))
+        self.deadlines = {**rate_limit_deadlines, **(deadlines or {})}
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._stats = {"acquired": 0, "queued": 0, "rejections": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0}
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    # Wait for a token; returns the seconds spent waiting or raises RateLimitExceeded
+    def acquire(self, priority=None, deadline=None):
+        priority = current_priority() if priority is None else priority
+        deadline = self.deadlines.get(priority, max(self.deadlines.values())) if deadline is None else deadline
+        started = time.monotonic()
+        with self._condition:
+            self._refill(started)
+            if not self._waiting and self._tokens >= 1:
+                self._tokens -= 1
+                self._stats["acquired"] += 1
+                return 0.0
+
+            entry = (priority, next(self._sequence))
+            heapq.heappush(self._waiting, entry)
+            self._stats["queued"] += 1
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self._waiting[0] == entry and self._tokens >= 1:
+                    heapq.heappop(self._waiting)
+                    self._tokens -= 1
+                    waited = now - started
+                    _add_limiter_wait(waited)
+                    self._stats["acquired"] += 1
+                    self._stats["wait_seconds"] += waited
+                    self._stats["max_wait_seconds"] = max(self._stats["max_wait_seconds"], waited)
+                    self._condition.notify_all()
+                    return waited
+                remaining = started + deadline - now
+                if remaining <= 0:
+                    _add_limiter_wait(now - started)
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+                    self._stats["rejections"] += 1
+                    self._condition.notify_all()
+                    raise RateLimitExceeded("Too many requests right now; please try again in a moment.")
+                if self._waiting[0] == entry:
+                    remaining = min(remaining, (1 - self._tokens) / self.rate)
+                self._condition.wait(remaining)
+
+    # Snapshot of the limiter's counters, including the current queue length
+    def stats(self):
+        with self._condition:
+            stats = dict(self._stats)
+            stats["waiting"] = len(self._waiting)
+        served_after_queueing = stats["queued"] - stats["rejections"] - stats["waiting"]
+        stats["avg_wait_seconds"] = stats["wait_seconds"] / served_after_queueing if served_after_queueing > 0 else 0.0
+        return stats
+
+
+class CircuitBreaker:
+    """
+    Tracks the last `window` calls to one upstream. When at least `min_calls` are
+    recorded and the share of failed calls reaches `failure_rate`, or the share
+    of calls slower than `slow_call_seconds` reaches `slow_rate`, the breaker
+    opens: call() skips the upstream and returns fallback() instead. After
+    `open_seconds` a single probe call is let through (half-open); success closes
+    the breaker, failure keeps it open for another `open_seconds`.
+    """
+
+    def __init__(self, name, failure_rate=0.5, slow_call_seconds=5.0, slow_rate=0.8, window=20, min_calls=5, open_seconds=30.0):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate = slow_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self._calls = deque(maxlen=window)
+        self._state = "closed"
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "failures": 0, "slow_calls": 0, "opened": 0, "probes": 0, "fallbacks": 0}
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    # Decide whether this call may go to the upstream; returns (allowed, is_probe)
+    def _allow(self):
+        with self._lock:
+            if self._state == "closed":
+                return True, False
+            if not self._probing and time.monotonic() - self._opened_at >= self.open_seconds:
+                self._state = "half_open"
+                self._probing = True
+                self._stats["probes"] += 1
+                return True, True
+            return False, False
+
+    def _open(self):
+        self._state = "open"
+        self._opened_at = time.monotonic()
+        self._calls.clear()
+        self._stats["opened"] += 1
+
+    # Record the outcome of an upstream call
+    def _record(self, ok, seconds, is_probe):
+        slow = seconds >= self.slow_call_seconds
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["failures"] += not ok
+            self._stats["slow_calls"] += slow
+            if is_probe:
+                self._probing = False
+                if ok and not slow:
+                    self._state = "closed"
+                else:
+                    self._open()
+                return
+            if self._state != "closed":
+                return
+            self._calls.append((ok, slow))
+            if len(self._calls) >= self.min_calls:
+                failures = sum(not call_ok for call_ok, _ in self._calls) / len(self._calls)
+                slow_calls = sum(call_slow for _, call_slow in self._calls) / len(self._calls)
+                if failures >= self.failure_rate or slow_calls >= self.slow_rate:
+                    self._open()
+
+    # Call the upstream through the breaker, using fallback() while it is open or when the call fails
+    def call(self, func, fallback=None, is_error=None):
+        """
+        `is_error(result)` tells failed results apart from good ones (by default a
+        dict with an "error" key). Exceptions count as failures and are raised
+        again when there is no fallback.
+        """
+        is_error = is_error or (lambda result: isinstance(result, dict) and "error" in result)
+        allowed, is_probe = self._allow()
+        if not allowed:
+            with self._lock:
+                self._stats["fallbacks"] += 1
+            if fallback is None:
+                raise CircuitOpenError(f"{self.name} is temporarily unavailable.")
+            return fallback()
+
+        # Only the upstream exchange counts towards latency, not time queued in a rate limiter
+        started, waited = time.monotonic(), limiter_wait_seconds()
+        elapsed = lambda: time.monotonic() - started - (limiter_wait_seconds() - waited)
+        try:
+            result = func()
+        except Exception:
+            self._record(False, elapsed(), is_probe)
+            if fallback is None:
+                raise
+            with self._lock:
+                self._stats["fallbacks"] += 1
+            return fallback()
+        ok = not is_error(result)
+        self._record(ok, elapsed(), is_probe)
+        if ok or fallback is None:
+            return result
+        with self._lock:
+            self._stats["fallbacks"] += 1
+        return fallback()
+
+    # Snapshot of the breaker's counters and state
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["state"] = self._state
+        return stats
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised by CircuitBreaker.call() when the breaker is open and there is no fallback."""
+
+
+# Function to turn a failed request into an {"error": ...} result, marking failures that are not the upstream's fault
+def request_error(e):
+    """
+    Local rate limiter rejections and 4xx answers (bad parameters, unknown ids)
+    get "client_error": True, so breakers pass them to the user unchanged.
+    """
+    response = getattr(e, "response", None)
+    client_error = isinstance(e, RateLimitExceeded) or (response is not None and 400 <= response.status_code < 500)
+    return {"error": str(e), "client_error": True} if client_error else {"error": str(e)}
+
+
+# is_error for CircuitBreaker.call(): only errors the upstream is responsible for count as failures
+def upstream_failed(result):
+    return isinstance(result, dict) and "error" in result and not result.get("client_error")
+
+
+# Function to send an authenticated request, refreshing the token once if the token's own host answers 401
+def authorized_request(token_manager, method, url, headers=None, rate_limiter=None, **kwargs):
+    """
+    Adds the Bearer token to the request headers and returns the response (errors
+    are left to the caller's raise_for_status). Raises AmadeusAuthError if no token
+    can be obtained, and RateLimitExceeded if `rate_limiter` has no slot in time.
+    """
+    headers = dict(headers or {})
+    # Every transport attempt, including the client's retries, takes its own rate limiter token
+    before_attempt = rate_limiter.acquire if rate_limiter is not None else None
+    for attempt in range(2):
+        token = token_manager.get_token()
+        headers["Authorization"] = f"Bearer {token}"
+        response = http_client.request(method, url, headers=headers, before_attempt=before_attempt, **kwargs)
+        # A 401 from another host (e.g. production endpoints) says nothing about the shared token
+        if response.status_code != 401 or attempt or not token_manager.issued_for(url):
+            return response
+        token_manager.invalidate(token)
+    return response
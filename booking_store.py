@@ -0,0 +1,354 @@
+import sqlite3
+import json
+import ast
+import time
+import threading
+import atexit
+from datetime import datetime
+
+# Booking ID prefix for each service
+booking_id_prefixes = {'flight': 'FL', 'hotel': 'HL', 'car': 'CR'}
+
+# Bookings can be canceled for this long after they are made
+CANCELLATION_WINDOW_SECONDS = 24 * 3600
+
+# Columns derived from the JSON details with SQLite's JSON1 functions, so filters run in SQL
+booking_detail_columns = {
+    "travel_city": "COALESCE(json_extract(details, '$.city'), json_extract(details, '$.destination'))",
+    "travel_date": "COALESCE(json_extract(details, '$.checkin_date'), json_extract(details, '$.pickup_date'), json_extract(details, '$.departure_date'))",
+}
+
+
+# Function to open a connection to the bookings database (one per call, like login_signup.get_db_connection)
+def get_booking_connection(db_file='travel_booking.db'):
+    conn = sqlite3.connect(db_file, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+# Function to create the bookings table, its index and the booking ID sequence
+def create_bookings_table(conn):
+    """
+    booking_id is the primary key and (user_email, canceled, booking_date) is indexed,
+    so a user's history is an index range scan. Tables from older versions (no primary
+    key, possibly duplicate IDs) are migrated once; duplicates keep their row with
+    "-<rowid>" appended to the ID, and a legacy user_name column is carried into
+    the details as "user_name".
+
+    Details are stored as JSON. travel_city and travel_date are virtual columns
+    extracted from it and indexed per user, and details still in the old str(dict)
+    format are converted once with ast.literal_eval (never eval).
+
+    cancel_deadline holds the end of the cancellation window as Unix seconds, and a
+    partial index over still-cancellable bookings answers "what can this user cancel"
+    without reading the rest of their history.
+    """
+    columns = {row[1]: row[5] for row in conn.execute("PRAGMA table_info(bookings)")}
+    if columns and not columns.get("booking_id"):
+        conn.execute("ALTER TABLE bookings RENAME TO bookings_legacy")
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS bookings (
+            booking_id TEXT PRIMARY KEY NOT NULL,
+            user_email TEXT,
+            service_type TEXT,
+            details TEXT,
+            booking_date TEXT,
+            canceled INTEGER DEFAULT 0
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_bookings_user ON bookings (user_email, canceled, booking_date)")
+    conn.execute("CREATE TABLE IF NOT EXISTS booking_sequence (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+    conn.execute("INSERT OR IGNORE INTO booking_sequence (name, value) VALUES ('booking', 0)")
+
+    if columns and not columns.get("booking_id"):
+        details = "details"
+        if "user_name" in columns:
+            # Details must be JSON before user_name can be added to them
+            for rowid, legacy in conn.execute("SELECT rowid, details FROM bookings_legacy WHERE NOT json_valid(details)").fetchall():
+                conn.execute("UPDATE bookings_legacy SET details=? WHERE rowid=?", (json.dumps(_parse_legacy_details(legacy)), rowid))
+            details = "CASE WHEN user_name IS NULL THEN details ELSE json_insert(COALESCE(details, '{}'), '$.user_name', user_name) END"
+        conn.execute(f"""
+            INSERT INTO bookings (booking_id, user_email, service_type, details, booking_date, canceled)
+            SELECT CASE
+                       WHEN booking_id IS NULL THEN 'XX-' || rowid
+                       WHEN EXISTS (SELECT 1 FROM bookings_legacy AS earlier
+                                    WHERE earlier.booking_id = legacy.booking_id AND earlier.rowid < legacy.rowid)
+                           THEN booking_id || '-' || rowid
+                       ELSE booking_id
+                   END,
+                   user_email, service_type, {details}, booking_date, canceled
+            FROM bookings_legacy AS legacy
+            ORDER BY rowid
+        """)
+        conn.execute("DROP TABLE bookings_legacy")
+
+    legacy_details = conn.execute("SELECT booking_id, details FROM bookings WHERE NOT json_valid(details)").fetchall()
+    for booking_id, details in legacy_details:
+        conn.execute("UPDATE bookings SET details=? WHERE booking_id=?", (json.dumps(_parse_legacy_details(details)), booking_id))
+
+    columns = [row[1] for row in conn.execute("PRAGMA table_xinfo(bookings)")]
+    for column, expression in booking_detail_columns.items():
+        if column not in columns:
+            conn.execute(f"ALTER TABLE bookings ADD COLUMN {column} TEXT GENERATED ALWAYS AS ({expression}) VIRTUAL COLLATE NOCASE")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_bookings_travel ON bookings (user_email, travel_city, travel_date)")
+
+    if "cancel_deadline" not in columns:
+        conn.execute("ALTER TABLE bookings ADD COLUMN cancel_deadline INTEGER")
+        conn.execute("ALTER TABLE bookings ADD COLUMN cancellable INTEGER DEFAULT 0")
+        conn.execute(f"""
+            UPDATE bookings
+            SET cancel_deadline = CAST(strftime('%s', booking_date, 'utc') AS INTEGER) + {CANCELLATION_WINDOW_SECONDS},
+                cancellable = (canceled = 0)
+        """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_bookings_cancellable ON bookings (user_email, cancel_deadline)
+        WHERE canceled = 0 AND cancellable = 1
+    """)
+    conn.commit()
+    sweep_expired_cancellations(conn)
+
+
+# Function to read details written by older versions as str(dict)
+def _parse_legacy_details(details):
+    try:
+        parsed = ast.literal_eval(details or "{}")
+    except (ValueError, SyntaxError):
+        parsed = None
+    return parsed if isinstance(parsed, dict) else {"text": details}
+
+
+# Function to allocate the next booking ID; must run inside the write transaction that inserts the booking
+def next_booking_id(conn, service_type):
+    """
+    IDs look like FL20240922153000-000042: the booking time for readability plus a
+    database-wide sequence number. The sequence row is updated under SQLite's write
+    lock, so concurrent writers (threads or processes) always get distinct,
+    strictly increasing numbers.
+    """
+    sequence = conn.execute("UPDATE booking_sequence SET value = value + 1 WHERE name = 'booking' RETURNING value").fetchone()[0]
+    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
+    return f"{booking_id_prefixes.get(service_type, 'XX')}{timestamp}-{sequence:06d}"
+
+
+# Function to store a booking and return its new booking ID
+def store_booking(user_email, service_type, details, db_file='travel_booking.db'):
+    conn = get_booking_connection(db_file)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        booking_id = next_booking_id(conn, service_type)
+        booked_at = time.time()
+        conn.execute("INSERT INTO bookings (booking_id, user_email, service_type, details, booking_date, canceled, cancel_deadline, cancellable) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                     (booking_id, user_email, service_type, json.dumps(details), datetime.fromtimestamp(booked_at).strftime('%Y-%m-%d %H:%M:%S'), 0,
+                      int(booked_at) + CANCELLATION_WINDOW_SECONDS, 1))
+        conn.commit()
+        return booking_id
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+# Function to fetch a user's bookings (active or canceled), newest first, with the details decoded
+def fetch_booking_history(user_email, canceled=0, service_type=None, city=None, travel_from=None, travel_to=None, db_file='travel_booking.db'):
+    """
+    Optional filters run in SQL: service_type, city (hotel/car city or flight
+    destination, case-insensitive) and travel dates (check-in, pick-up or departure)
+    between travel_from and travel_to, both inclusive 'YYYY-MM-DD' strings.
+    """
+    conditions, params = _booking_filters(service_type, city, travel_from, travel_to)
+    conditions[:0] = ["user_email = ?", "canceled = ?"]
+    params[:0] = [user_email, canceled]
+
+    conn = get_booking_connection(db_file)
+    try:
+        rows = conn.execute(f"""
+            SELECT booking_id, service_type, details, booking_date FROM bookings
+            WHERE {' AND '.join(conditions)}
+            ORDER BY booking_date DESC
+        """, params).fetchall()
+    finally:
+        conn.close()
+    return [(booking_id, service, json.loads(details), booking_date) for booking_id, service, details, booking_date in rows]
+
+
+# Function to turn the optional booking filters into SQL conditions and parameters
+def _booking_filters(service_type=None, city=None, travel_from=None, travel_to=None):
+    conditions = []
+    params = []
+    if service_type:
+        conditions.append("service_type = ?")
+        params.append(service_type)
+    if city:
+        conditions.append("travel_city = ?")
+        params.append(city)
+    if travel_from:
+        conditions.append("travel_date >= ?")
+        params.append(str(travel_from))
+    if travel_to:
+        conditions.append("travel_date <= ?")
+        params.append(str(travel_to))
+    return conditions, params
+
+
+# Function to fetch the bookings a user can still cancel, soonest deadline first
+def fetch_cancellable_bookings(user_email, service_type=None, city=None, travel_from=None, travel_to=None, db_file='travel_booking.db'):
+    """
+    Returns [(booking_id, service_type, cancel_deadline)], found through
+    idx_bookings_cancellable. Takes the same optional filters as
+    fetch_booking_history, checked on the few rows the index yields.
+    """
+    conditions, params = _booking_filters(service_type, city, travel_from, travel_to)
+    conn = get_booking_connection(db_file)
+    try:
+        return conn.execute(f"""
+            SELECT booking_id, service_type, cancel_deadline FROM bookings
+            WHERE user_email = ? AND canceled = 0 AND cancellable = 1 AND cancel_deadline > ?
+                  {''.join(f' AND {condition}' for condition in conditions)}
+            ORDER BY cancel_deadline
+        """, [user_email, int(time.time())] + params).fetchall()
+    finally:
+        conn.close()
+
+
+# Function to cancel one of a user's bookings; returns False if it was no longer cancellable
+def cancel_booking(booking_id, user_email, db_file='travel_booking.db'):
+    conn = get_booking_connection(db_file)
+    try:
+        cursor = conn.execute("""
+            UPDATE bookings SET canceled=1, cancellable=0
+            WHERE booking_id=? AND user_email=? AND canceled=0 AND cancellable=1 AND cancel_deadline > ?
+        """, (booking_id, user_email, int(time.time())))
+        conn.commit()
+        return cursor.rowcount == 1
+    finally:
+        conn.close()
+
+
+# Function to mark every booking whose cancellation window has closed, in one statement
+def sweep_expired_cancellations(conn, now=None):
+    cursor = conn.execute("""
+        UPDATE bookings SET cancellable = 0
+        WHERE canceled = 0 AND cancellable = 1 AND cancel_deadline <= ?
+    """, (int(time.time() if now is None else now),))
+    conn.commit()
+    return cursor.rowcount
+
+
+class CancellationSweeper:
+    """
+    Background thread that runs sweep_expired_cancellations every `interval`
+    seconds. Eligibility queries also compare cancel_deadline with the current
+    time, so the sweep only keeps the cancellable index small; it is not needed
+    for correctness.
+    """
+
+    def __init__(self, db_file='travel_booking.db', interval=60.0):
+        self.db_file = db_file
+        self.interval = interval
+        self._stop = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._stats = {"sweeps": 0, "expired": 0, "last_sweep_ms": 0.0}
+        self._thread = threading.Thread(target=self._run, name="cancellation-sweeper", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # Snapshot of the sweeper's counters
+    def stats(self):
+        with self._stats_lock:
+            return dict(self._stats)
+
+    # Stop the background thread
+    def close(self, timeout=10):
+        if not self._stop.is_set():
+            self._stop.set()
+            self._thread.join(timeout)
+
+    def _run(self):
+        conn = get_booking_connection(self.db_file)
+        try:
+            while not self._stop.is_set():
+                started = time.perf_counter()
+                try:
+                    expired = sweep_expired_cancellations(conn)
+                except sqlite3.Error as e:
+                    print(f"Error sweeping expired cancellations: {e}")
+                    expired = 0
+                with self._stats_lock:
+                    self._stats["sweeps"] += 1
+                    self._stats["expired"] += expired
+                    self._stats["last_sweep_ms"] = (time.perf_counter() - started) * 1000
+                self._stop.wait(self.interval)
+        finally:
+            conn.close()
+
+
+# One sweeper per database file, shared by every session in the process
+_sweepers = {}
+_sweepers_lock = threading.Lock()
+
+
+# Function to get (and start on first use) the process-wide sweeper for a database file
+def get_cancellation_sweeper(db_file='travel_booking.db'):
+    with _sweepers_lock:
+        if db_file not in _sweepers:
+            _sweepers[db_file] = CancellationSweeper(db_file)
+        return _sweepers[db_file]
+
+
+# Worker used by the stress test: store `count` bookings and return the IDs in the order they were issued
+def _stress_worker(args):
+    db_file, worker, count = args
+    return [store_booking(f"stress{worker}@example.com", ('flight', 'hotel', 'car')[i % 3], {"n": i}, db_file) for i in range(count)]
+
+
+# Runs one group of stress writers as threads inside a single process
+def _stress_thread_group(jobs):
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(len(jobs)) as thread_pool:
+        return list(thread_pool.map(_stress_worker, jobs))
+
+
+# Function to hammer store_booking from several processes and threads and check every ID is unique and ordered
+def stress_test_booking_ids(db_file='booking_stress_test.db', processes=4, threads=8, bookings_per_writer=100):
+    import os
+    from concurrent.futures import ProcessPoolExecutor
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_file + suffix):
+            os.remove(db_file + suffix)
+    conn = get_booking_connection(db_file)
+    create_bookings_table(conn)
+    conn.close()
+
+    jobs = [(db_file, worker, bookings_per_writer) for worker in range(processes * threads)]
+    started = time.perf_counter()
+    with ProcessPoolExecutor(processes) as process_pool:
+        # Each process runs `threads` writers of its own
+        results = list(process_pool.map(_stress_thread_group, [jobs[i::processes] for i in range(processes)]))
+    seconds = time.perf_counter() - started
+
+    issued = [ids for group in results for ids in group]
+    all_ids = [booking_id for ids in issued for booking_id in ids]
+    sequences = [[int(booking_id.rsplit('-', 1)[1]) for booking_id in ids] for ids in issued]
+    conn = get_booking_connection(db_file)
+    stored = conn.execute("SELECT COUNT(*), COUNT(DISTINCT booking_id) FROM bookings").fetchone()
+    conn.close()
+
+    expected = processes * threads * bookings_per_writer
+    unique = len(set(all_ids)) == len(all_ids) == expected
+    ordered = all(seq == sorted(seq) and len(set(seq)) == len(seq) for seq in sequences)
+    print(f"{expected} bookings from {processes} processes x {threads} threads in {seconds:.2f}s ({expected / seconds:.0f}/s)")
+    print(f"stored rows: {stored[0]}, distinct IDs: {stored[1]}, unique: {unique}, monotonic per writer: {ordered}")
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_file + suffix):
+            os.remove(db_file + suffix)
+    return unique and ordered and stored == (expected, expected)
+
+
+# Run the stress test when executed directly
+if __name__ == "__main__":
+    stress_test_booking_ids()
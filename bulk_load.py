@@ -0,0 +1,152 @@
+import csv
+import sys
+import time
+from itertools import islice
+
+from travel_db import rebuild_derived_tables
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Rows per executemany call and rows per transaction
+DEFAULT_CHUNK_SIZE = 50000
+DEFAULT_ROWS_PER_TRANSACTION = 1000000
+
+# Source CSV for each dataset table
+csv_tables = {
+    "car_rental": "synthetic_car_rental_data.csv",
+    "flight": "synthetic_flight_data.csv",
+    "hotel": "synthetic_hotel_data.csv",
+    "travel_advisory": "synthetic_travel_advisories.csv",
+}
+
+
+# Function to get the process's peak resident set size in MiB (None where it can't be measured)
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _to_int(value):
+    return int(float(value)) if value != "" else None
+
+
+def _to_float(value):
+    return float(value) if value != "" else None
+
+
+# Converter for each declared column type; anything else is stored as text
+_column_converters = {"INTEGER": _to_int, "REAL": _to_float}
+
+
+# Function to stream one CSV file into an existing table
+def bulk_load_csv(conn, table, csv_file, chunk_size=DEFAULT_CHUNK_SIZE, rows_per_transaction=DEFAULT_ROWS_PER_TRANSACTION):
+    """
+    Reads the CSV with the csv module `chunk_size` rows at a time, so memory stays
+    flat however large the file is, converts each value with the type declared
+    for its column in the table (INTEGER/REAL/TEXT) and inserts each chunk with one
+    prepared executemany, committing every `rows_per_transaction` rows.
+    The table's own indexes and triggers are dropped for the load. Afterwards the
+    indexes are recreated, and if the table had triggers its derived tables
+    (interval index, full-text index, price statistics) are rebuilt once, which
+    also recreates their triggers, instead of firing them for every row.
+    Returns the number of rows loaded.
+    """
+    if conn.in_transaction:
+        conn.commit()
+    declared = {row[1]: (row[2] or "TEXT").upper() for row in conn.execute(f"PRAGMA table_info({table})")}
+    if not declared:
+        raise ValueError(f"Table {table} does not exist.")
+    indexes = conn.execute("SELECT name, sql FROM sqlite_master WHERE type='index' AND tbl_name=? AND sql IS NOT NULL", (table,)).fetchall()
+    triggers = conn.execute("SELECT name, sql FROM sqlite_master WHERE type='trigger' AND tbl_name=?", (table,)).fetchall()
+    for name, _ in indexes:
+        conn.execute(f"DROP INDEX {name}")
+    for name, _ in triggers:
+        conn.execute(f"DROP TRIGGER {name}")
+
+    loaded = 0
+    with open(csv_file, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header:
+            raise ValueError(f"{csv_file} is empty.")
+        unknown = [column for column in header if column not in declared]
+        if unknown:
+            raise ValueError(f"{csv_file} has columns not in {table}: {', '.join(unknown)}")
+        converters = [_column_converters.get(declared[column]) for column in header]
+        insert_sql = f"INSERT INTO {table} ({', '.join(header)}) VALUES ({', '.join('?' for _ in header)})"
+
+        conn.execute("BEGIN")
+        while True:
+            chunk = [
+                tuple(value if convert is None else convert(value) for value, convert in zip(row, converters))
+                for row in islice(reader, chunk_size)
+            ]
+            if not chunk:
+                break
+            conn.executemany(insert_sql, chunk)
+            loaded += len(chunk)
+            if loaded % rows_per_transaction < len(chunk):
+                conn.commit()
+                conn.execute("BEGIN")
+        conn.commit()
+
+    for _, sql in indexes:
+        conn.execute(sql)
+    conn.commit()
+    if triggers:
+        rebuild_derived_tables(conn, table)
+        # Triggers that no derived table owns are put back as they were
+        existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='trigger' AND tbl_name=?", (table,))}
+        for name, sql in triggers:
+            if name not in existing:
+                conn.execute(sql)
+        conn.commit()
+    return loaded
+
+
+# Function to load several tables, printing rows/sec and peak RSS for each
+def bulk_load(conn, tables=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    `tables` maps table name to CSV file (csv_tables by default). Durability is
+    relaxed for the duration of the load (synchronous=OFF) and restored after.
+    """
+    tables = tables or csv_tables
+    synchronous = conn.execute("PRAGMA synchronous").fetchone()[0]
+    conn.execute("PRAGMA synchronous=OFF")
+    total = 0
+    try:
+        for table, csv_file in tables.items():
+            started = time.perf_counter()
+            rows = bulk_load_csv(conn, table, csv_file, chunk_size)
+            seconds = time.perf_counter() - started
+            total += rows
+            rss = peak_rss_mb()
+            rss_text = f", peak RSS {rss:.0f} MiB" if rss is not None else ""
+            print(f"{table}: {rows} rows in {seconds:.2f}s ({rows / seconds if seconds else 0:.0f} rows/s){rss_text}")
+    finally:
+        conn.execute(f"PRAGMA synchronous={synchronous}")
+    return total
+
+
+# Load CSVs from the command line: python bulk_load.py [db_file] [table=csv_file ...]
+if __name__ == "__main__":
+    from utils import create_connection, create_tables
+    from travel_db import build_interval_indexes, build_fts_indexes, build_price_aggregates
+
+    db_file = sys.argv[1] if len(sys.argv) > 1 else 'travel_chatbot.db'
+    tables = dict(arg.split("=", 1) for arg in sys.argv[2:]) or None
+    conn = create_connection(db_file)
+    create_tables(conn)
+    started = time.perf_counter()
+    rows = bulk_load(conn, tables)
+    print(f"Loaded {rows} rows in {time.perf_counter() - started:.2f}s; building indexes.")
+    build_interval_indexes(conn)
+    build_fts_indexes(conn)
+    build_price_aggregates(conn)
+    conn.close()
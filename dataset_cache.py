@@ -0,0 +1,357 @@
+import os
+import json
+import shutil
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; publishing is then only safe within one process
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+
+# Directory holding the converted datasets, shared by every worker process on the host
+dataset_cache_dir = os.environ.get("TRAVEL_DATASET_CACHE", ".dataset_cache")
+
+# Generations kept on disk per dataset; older ones are removed when a new one is published
+KEEP_GENERATIONS = 2
+
+# Version of the on-disk layout; generations written by an older layout are converted again
+DATASET_FORMAT = 2
+
+# Times attach_dataset re-reads CURRENT when the generation it found disappears underneath it
+ATTACH_ATTEMPTS = 3
+
+# Datasets used by the Streamlit pages
+dataset_files = [
+    "synthetic_flight_data.csv",
+    "synthetic_hotel_data.csv",
+    "synthetic_car_rental_data.csv",
+    "synthetic_travel_advisories.csv",
+    "large_user_recommendations.csv",
+]
+
+
+def _source_signature(csv_file):
+    stat = os.stat(csv_file)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "format": DATASET_FORMAT}
+
+
+def _cache_path(csv_file):
+    return os.path.join(dataset_cache_dir, os.path.splitext(os.path.basename(csv_file))[0])
+
+
+# Function to read which generation of a dataset is current (0 if none has been published)
+def current_generation(csv_file):
+    try:
+        with open(os.path.join(_cache_path(csv_file), "CURRENT")) as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+# Context manager that holds the dataset's cross-process publish lock
+@contextmanager
+def _publish_lock(base):
+    os.makedirs(base, exist_ok=True)
+    with open(os.path.join(base, "LOCK"), "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+# Function to convert a CSV file into a new generation of per-column .npy files and make it current
+def publish_dataset(csv_file, force=False):
+    """
+    Numeric and boolean columns are saved as arrays of their own dtype. Text
+    columns (City, Airline, Room_Type, dates, ...) are saved as integer codes
+    plus a JSON list of the distinct values. Each publish writes a new gen-<n> directory and then atomically
+    replaces the CURRENT pointer, so workers attached to the previous generation
+    keep reading consistent files until they refresh.
+
+    Publishers on the host take turns under a file lock. Unless `force` is set,
+    a worker that gets the lock after another one already published the CSV's
+    current contents reuses that generation instead of converting again.
+    Returns the current generation.
+    """
+    base = _cache_path(csv_file)
+    with _publish_lock(base):
+        signature = _source_signature(csv_file)
+        generation = current_generation(csv_file)
+        if not force and generation:
+            meta = _read_meta(os.path.join(base, f"gen-{generation}"))
+            if meta and meta["signature"] == signature:
+                return generation
+
+        data = pd.read_csv(csv_file)
+        staging = os.path.join(base, f"tmp-{os.getpid()}-{threading.get_ident()}")
+        os.makedirs(staging, exist_ok=True)
+
+        columns = []
+        for position, column in enumerate(data.columns):
+            values = data[column]
+            if pd.api.types.is_numeric_dtype(values):
+                np.save(os.path.join(staging, f"{position}.npy"), values.to_numpy())
+                columns.append({"name": column, "kind": "numeric"})
+            else:
+                categorical = pd.Categorical(values.astype("string"))
+                np.save(os.path.join(staging, f"{position}.npy"), categorical.codes)
+                columns.append({"name": column, "kind": "categorical", "categories": [str(c) for c in categorical.categories]})
+
+        meta = {
+            "source": os.path.abspath(csv_file),
+            "signature": signature,
+            "rows": len(data),
+            # What each worker would hold privately if it parsed the CSV itself
+            "in_memory_bytes": int(data.memory_usage(deep=True).sum()),
+            "columns": columns,
+        }
+        with open(os.path.join(staging, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+        # Skip generation numbers left behind by an interrupted publish
+        while os.path.exists(os.path.join(base, f"gen-{generation + 1}")):
+            generation += 1
+        generation += 1
+        os.rename(staging, os.path.join(base, f"gen-{generation}"))
+
+        pointer = os.path.join(base, f"CURRENT.tmp-{os.getpid()}-{threading.get_ident()}")
+        with open(pointer, "w") as f:
+            f.write(str(generation))
+        os.replace(pointer, os.path.join(base, "CURRENT"))
+
+        # Only generations older than the new current one are removed; workers
+        # still mapping them keep their mappings until they refresh
+        for name in os.listdir(base):
+            if name.startswith("gen-") and int(name[4:]) <= generation - KEEP_GENERATIONS:
+                shutil.rmtree(os.path.join(base, name), ignore_errors=True)
+        return generation
+
+
+def _read_meta(path):
+    try:
+        with open(os.path.join(path, "meta.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# Function to open a converted dataset as a DataFrame backed by memory-mapped arrays
+def open_dataset(path, meta=None):
+    """
+    Numeric columns stay memory-mapped. Text columns come back as object columns,
+    the dtype pd.read_csv gives them (not Categorical, which breaks ordered
+    comparisons and sorts by code), holding one shared str per distinct value.
+    """
+    meta = meta or _read_meta(path)
+    data = {}
+    for position, column in enumerate(meta["columns"]):
+        values = np.load(os.path.join(path, f"{position}.npy"), mmap_mode="r")
+        if column["kind"] == "categorical":
+            # Code -1 marks a missing value and picks the trailing NaN
+            values = np.array(column["categories"] + [np.nan], dtype=object)[values]
+        data[column["name"]] = values
+    return pd.DataFrame(data, copy=False)
+
+
+# Datasets attached in this process: csv path -> {"generation", "signature", "meta", "data"}
+_datasets = {}
+_datasets_lock = threading.Lock()
+
+
+# Function to attach to the current generation of a dataset, publishing it first if it is missing or stale
+def attach_dataset(csv_file):
+    """
+    Returns a read-only DataFrame whose columns are memory-mapped from the shared
+    files, so every worker process on the host reads the same physical pages
+    instead of holding its own copy. Attaching again is free until the CSV
+    changes or another process publishes a new generation. Callers must not
+    modify the frame in place; use .copy() first if needed.
+    """
+    signature = _source_signature(csv_file)
+    key = os.path.abspath(csv_file)
+    with _datasets_lock:
+        generation = current_generation(csv_file)
+        attached = _datasets.get(key)
+        if attached and attached["generation"] == generation and attached["signature"] == signature:
+            return attached["data"]
+
+        for attempt in range(ATTACH_ATTEMPTS):
+            generation = current_generation(csv_file)
+            path = os.path.join(_cache_path(csv_file), f"gen-{generation}")
+            meta = _read_meta(path) if generation else None
+            if not meta or meta["signature"] != signature:
+                generation = publish_dataset(csv_file)
+                path = os.path.join(_cache_path(csv_file), f"gen-{generation}")
+                meta = _read_meta(path)
+            try:
+                if meta is None:
+                    raise FileNotFoundError(os.path.join(path, "meta.json"))
+                data = open_dataset(path, meta)
+                break
+            except (OSError, ValueError):
+                # Another worker replaced and pruned this generation; read CURRENT again
+                if attempt + 1 == ATTACH_ATTEMPTS:
+                    raise
+        _datasets[key] = {"generation": generation, "signature": signature, "meta": meta, "data": data}
+        return data
+
+
+# The pages load datasets through the same call
+load_dataset = attach_dataset
+
+
+# Function to load several datasets at once
+def load_datasets(*csv_files):
+    return tuple(load_dataset(csv_file) for csv_file in csv_files)
+
+
+# Function to re-attach every dataset this process holds whose generation has moved on
+def refresh_datasets():
+    """Returns {csv path: new generation} for the datasets that were re-attached."""
+    with _datasets_lock:
+        stale = {key: current_generation(key) for key, attached in _datasets.items()
+                 if current_generation(key) != attached["generation"]}
+    for key in stale:
+        attach_dataset(key)
+    return stale
+
+
+def _mapped_memory():
+    """Rss/Pss/shared/private kB of this process's mappings of the cache files, per file path (Linux only)."""
+    cache_root = os.path.abspath(dataset_cache_dir)
+    usage = {}
+    current = None
+    try:
+        with open("/proc/self/smaps") as f:
+            for line in f:
+                fields = line.split()
+                if not fields[0].endswith(":"):
+                    # Mapping header: address perms offset dev inode [path]
+                    current = fields[5] if len(fields) > 5 and fields[5].startswith(cache_root) else None
+                elif current and fields[0] in ("Rss:", "Pss:", "Shared_Clean:", "Private_Clean:"):
+                    totals = usage.setdefault(current, {})
+                    totals[fields[0][:-1]] = totals.get(fields[0][:-1], 0) + int(fields[1])
+    except OSError:
+        return None
+    return usage
+
+
+# Function to report, per attached dataset, how much memory this worker saves by sharing the mapped files
+def dataset_memory_stats():
+    """
+    in_memory_bytes is what a private read_csv copy would take; private_bytes is
+    this worker's own share (Pss of the mapped files, counting shared pages
+    divided among the processes mapping them, plus the private object arrays of
+    the text columns); saved_bytes is the difference.
+    Where /proc/self/smaps is unavailable, the mapped file sizes are used instead.
+    """
+    mapped = _mapped_memory()
+    stats = {}
+    with _datasets_lock:
+        attached = dict(_datasets)
+    for key, entry in attached.items():
+        path = os.path.abspath(os.path.join(_cache_path(key), f"gen-{entry['generation']}"))
+        files = [os.path.join(path, f"{position}.npy") for position in range(len(entry["meta"]["columns"]))]
+        file_bytes = sum(os.path.getsize(name) for name in files if os.path.exists(name))
+        if mapped is not None:
+            resident = sum(mapped.get(name, {}).get("Rss", 0) for name in files) * 1024
+            private = sum(mapped.get(name, {}).get("Pss", 0) for name in files) * 1024
+        else:
+            resident = private = file_bytes
+        text_columns = [column["name"] for column in entry["meta"]["columns"] if column["kind"] == "categorical"]
+        private += int(entry["data"][text_columns].memory_usage(index=False).sum())
+        private += sum(sys.getsizeof(value) for column in entry["meta"]["columns"] for value in column.get("categories", []))
+        in_memory = entry["meta"].get("in_memory_bytes", 0)
+        stats[os.path.basename(key)] = {
+            "generation": entry["generation"],
+            "mapped_bytes": file_bytes,
+            "resident_bytes": resident,
+            "private_bytes": private,
+            "in_memory_bytes": in_memory,
+            "saved_bytes": max(0, in_memory - private),
+        }
+    return stats
+
+
+def _shared_worker(args):
+    csv_files, use_cache = args
+    import resource
+
+    frames = load_datasets(*csv_files) if use_cache else tuple(pd.read_csv(csv_file) for csv_file in csv_files)
+    # Touch every column so the pages are actually faulted in
+    checksum = sum(float(frame[column].sum()) if pd.api.types.is_numeric_dtype(frame[column])
+                   else len(frame[column]) for frame in frames for column in frame.columns)
+    stats = dataset_memory_stats() if use_cache else {}
+    return {
+        "pid": os.getpid(),
+        "checksum": checksum,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "private_mb": sum(s["private_bytes"] for s in stats.values()) / (1024 * 1024),
+        "saved_mb": sum(s["saved_bytes"] for s in stats.values()) / (1024 * 1024),
+        "in_memory_mb": sum(s["in_memory_bytes"] for s in stats.values()) / (1024 * 1024),
+    }
+
+
+# Function to compare worker processes that attach to the shared datasets with ones that parse the CSVs
+def benchmark_shared_datasets(workers=4, csv_files=None):
+    from multiprocessing import get_context
+
+    csv_files = list(csv_files or dataset_files)
+    for csv_file in csv_files:
+        attach_dataset(csv_file)
+
+    context = get_context("spawn")
+    for use_cache in (False, True):
+        with context.Pool(workers) as pool:
+            results = pool.map(_shared_worker, [(csv_files, use_cache)] * workers)
+        label = "shared mmap" if use_cache else "read_csv   "
+        for result in results:
+            extra = (f", private share {result['private_mb']:.1f} MiB of {result['in_memory_mb']:.1f} MiB, "
+                     f"saved {result['saved_mb']:.1f} MiB") if use_cache else ""
+            print(f"{label} worker {result['pid']}: peak RSS {result['peak_rss_mb']:.1f} MiB{extra}")
+
+    # A new generation is picked up by refresh_datasets() without restarting the process
+    generation = publish_dataset(csv_files[0], force=True)
+    print(f"published {csv_files[0]} generation {generation}; refreshed: {refresh_datasets()}")
+
+
+# Function to compare CSV parsing with the columnar cache
+def benchmark_dataset_cache(repeats=5):
+    for csv_file in dataset_files:
+        started = time.perf_counter()
+        for _ in range(repeats):
+            pd.read_csv(csv_file)
+        csv_ms = (time.perf_counter() - started) * 1000 / repeats
+
+        started = time.perf_counter()
+        generation = publish_dataset(csv_file, force=True)
+        convert_ms = (time.perf_counter() - started) * 1000
+
+        path = os.path.join(_cache_path(csv_file), f"gen-{generation}")
+        started = time.perf_counter()
+        for _ in range(repeats):
+            open_dataset(path)
+        open_ms = (time.perf_counter() - started) * 1000 / repeats
+
+        started = time.perf_counter()
+        load_dataset(csv_file)
+        for _ in range(repeats):
+            load_dataset(csv_file)
+        cached_ms = (time.perf_counter() - started) * 1000 / (repeats + 1)
+        print(f"{csv_file}: read_csv {csv_ms:.1f} ms, convert {convert_ms:.1f} ms, "
+              f"open mmap {open_ms:.2f} ms, process cache {cached_ms:.3f} ms")
+
+
+# Run the benchmarks when executed directly
+if __name__ == "__main__":
+    benchmark_dataset_cache()
+    benchmark_shared_datasets()
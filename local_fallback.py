@@ -0,0 +1,181 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+# Same city codes as utils.city_iata_mapping and utils.location_id_to_city
+city_iata_codes = {
+    "Mumbai": "BOM", "Delhi": "DEL", "Bangalore": "BLR", "Hyderabad": "HYD",
+    "Chennai": "MAA", "Kolkata": "CCU", "Pune": "PNQ", "Jaipur": "JAI",
+}
+zoomcar_location_ids = {
+    "Mumbai": 10, "Delhi": 11, "Bangalore": 12, "Hyderabad": 13, "Chennai": 14,
+    "Kolkata": 15, "Pune": 16, "Jaipur": 17,
+}
+airline_codes = {
+    "Air India": "AI", "AirAsia": "I5", "Alliance Air": "9I", "GoAir": "G8",
+    "IndiGo": "6E", "SpiceJet": "SG", "Vistara": "UK",
+}
+
+# Flight prices in the datasets are INR; Amadeus test offers are quoted in EUR.
+# The pages convert offer prices back with the same rate, so fallback prices round-trip.
+INR_PER_EUR = 110.0
+
+# Most rows returned per fallback search, like the API result pages
+FALLBACK_LIMIT = 25
+
+
+# Function to map an IATA city code back to the dataset's city name
+def iata_city(iata_code):
+    return next((city for city, code in city_iata_codes.items() if code == iata_code), None)
+
+
+# ---- Dataset rows in API response shapes ----
+
+# Function to turn a flight dataset row into an Amadeus flight offer
+def flight_offer(number, row, query):
+    """`row` maps the flight table's columns; `query` holds the flight-offers request parameters."""
+    origin, destination = query["originLocationCode"], query["destinationLocationCode"]
+    departure_date = query.get("departureDate") or datetime.now().strftime("%Y-%m-%d")
+    stops = 0 if row["Total_Stops"] == "non-stop" else int(row["Total_Stops"].split()[0])
+    hours, _, minutes = row["Duration"].replace("h", "").replace("m", "").partition(" ")
+    duration = timedelta(hours=int(hours or 0), minutes=int(minutes or 0))
+    departure = datetime.strptime(f"{departure_date} {row['Dep_Time']}", "%Y-%m-%d %H:%M")
+    via = [code for code in city_iata_codes.values() if code not in (origin, destination)]
+    airports = [origin] + via[:stops] + [destination]
+    leg = duration / (stops + 1)
+    carrier = airline_codes.get(row["Airline"], row["Airline"][:2].upper())
+    segments = []
+    for i in range(stops + 1):
+        segments.append({
+            "departure": {"iataCode": airports[i], "at": (departure + leg * i).strftime("%Y-%m-%dT%H:%M:%S")},
+            "arrival": {"iataCode": airports[i + 1], "at": (departure + leg * (i + 1)).strftime("%Y-%m-%dT%H:%M:%S")},
+            "carrierCode": carrier,
+            "number": str(100 + number * 10 + i),
+            "cabin": query.get("travelClass", "ECONOMY"),
+        })
+    hours, minutes = divmod(int(duration.total_seconds()) // 60, 60)
+    return {
+        "type": "flight-offer",
+        "id": str(number),
+        "itineraries": [{"duration": f"PT{hours}H{minutes}M", "segments": segments}],
+        "price": {"currency": "EUR", "total": f"{float(row['Price']) / INR_PER_EUR:.2f}"},
+        "validatingAirlineCodes": [carrier],
+    }
+
+
+# Function to describe a hotel the way the Amadeus hotel list does; ids are ST + city code + position
+def hotel_entry(city, index, name):
+    code = city_iata_codes[city]
+    return {
+        "name": name.upper(),
+        "hotelId": f"ST{code}{index + 1:03d}",
+        "iataCode": code,
+        "address": {"countryCode": "IN"},
+    }
+
+
+# Function to turn a car rental dataset row into a ZoomCar search result
+def car_entry(car_id, row):
+    return {
+        "carId": car_id,
+        "brand": row["Car_Rental_Company"],
+        "name": row["Car_Type"],
+        "locationId": zoomcar_location_ids.get(row["City"], 0),
+        "pricingDescription": f"{int(float(row['Price_Per_Day']))} INR per day",
+        "imageUrl": "https://via.placeholder.com/80x80",
+        "carAccessoriess": [] if row["Additional_Info"] == "No Info" else [{"accessoriesTitle": row["Additional_Info"]}],
+    }
+
+
+# Function to describe a car the way ZoomCar's GetCarById does
+def car_details(car_id, row):
+    car = car_entry(car_id, row)
+    car["vehicleNo"] = f"MH{car_id % 50:02d}ST{car_id:04d}"
+    car["pricing"] = int(float(row["Price_Per_Day"]))
+    return car
+
+
+# ---- Searches over the local tables ----
+
+def _query(db_file, sql, params):
+    # Read-only, so a missing database is an error instead of a new empty file
+    conn = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True, timeout=5)
+    conn.row_factory = sqlite3.Row
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def _unavailable(service, error):
+    return {"error": f"{service} is unavailable right now and no local results could be loaded ({error})."}
+
+
+# Function to answer a flight-offers search from the local flight table
+def fallback_flight_offers(params, db_file='travel_chatbot.db'):
+    """
+    Uses the (Source, Destination, Date_of_Journey) index and prefers the
+    flights closest to the requested date. The result has the flight-offers
+    shape plus "fallback": True.
+    """
+    origin, destination = iata_city(params.get("originLocationCode")), iata_city(params.get("destinationLocationCode"))
+    try:
+        rows = _query(db_file, """
+            SELECT * FROM flight
+            WHERE Source = ? AND Destination = ?
+            ORDER BY abs(julianday(Date_of_Journey) - julianday(?)), Price
+            LIMIT ?
+        """, (origin, destination, params.get("departureDate"), int(params.get("max", 10))))
+    except sqlite3.Error as e:
+        return _unavailable("Flight search", e)
+    offers = [flight_offer(number, row, params) for number, row in enumerate(rows, start=1)]
+    return {"meta": {"count": len(offers)}, "data": offers, "fallback": True}
+
+
+# Function to answer a hotels-by-city search from the local hotel table
+def fallback_hotel_list(params, db_file='travel_chatbot.db'):
+    city = iata_city(params.get("cityCode"))
+    try:
+        rows = _query(db_file, "SELECT DISTINCT Hotel_Name FROM hotel WHERE City = ? LIMIT ?", (city, FALLBACK_LIMIT))
+    except sqlite3.Error as e:
+        return _unavailable("Hotel search", e)
+    hotels = [hotel_entry(city, index, row["Hotel_Name"]) for index, row in enumerate(rows)]
+    return {"data": hotels, "meta": {"count": len(hotels)}, "fallback": True}
+
+
+# Function to answer a by-hotels lookup from the local hotel table, for the ids fallback_hotel_list hands out
+def fallback_hotel_details(params, db_file='travel_chatbot.db'):
+    """Ids that are not ST + city code + position (e.g. real Amadeus ids) are left out of the result."""
+    names = {}
+    hotels = []
+    try:
+        for hotel_id in params.get("hotelIds", "").split(","):
+            city, index = iata_city(hotel_id[2:5]), hotel_id[5:]
+            if not (hotel_id.startswith("ST") and city and index.isdigit()):
+                continue
+            if city not in names:
+                names[city] = [row["Hotel_Name"] for row in _query(db_file, "SELECT DISTINCT Hotel_Name FROM hotel WHERE City = ? LIMIT ?", (city, FALLBACK_LIMIT))]
+            if 0 < int(index) <= len(names[city]):
+                hotels.append(hotel_entry(city, int(index) - 1, names[city][int(index) - 1]))
+    except sqlite3.Error as e:
+        return _unavailable("Hotel details", e)
+    return {"data": hotels, "meta": {"count": len(hotels)}, "fallback": True}
+
+
+# Function to answer a car search from the local car_rental table, already enriched like get_car_rentals
+def fallback_car_rentals(city, db_file='travel_chatbot.db'):
+    try:
+        rows = _query(db_file, """
+            SELECT rowid AS car_id, * FROM car_rental
+            WHERE City = ? AND Availability_Status = 'Available'
+            LIMIT ?
+        """, (city, FALLBACK_LIMIT))
+    except sqlite3.Error as e:
+        return _unavailable("Car rental search", e)
+    cars = []
+    for row in rows:
+        car = car_details(row["car_id"], row)
+        car["mappedLocation"] = row["City"]
+        car["vehicleNumber"] = car["vehicleNo"]
+        car["finalPrice"] = car["pricing"]
+        cars.append(car)
+    return {"message": "", "result": True, "data": cars, "fallback": True}
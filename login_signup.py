@@ -2,29 +2,103 @@
 import streamlit as st
 
 import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+# Recently authenticated users kept in-process: email -> (cached_at, user row)
+USER_CACHE_SIZE = 1024
+USER_CACHE_TTL = 300
+_user_cache = OrderedDict()
+_user_cache_lock = threading.Lock()
+_users_table_ready = False
 
 # Modified database connection setup
 def get_db_connection():
     conn = sqlite3.connect('users.db', check_same_thread=False)
+    if not _users_table_ready:
+        create_users_table(conn)
     return conn
 
-# Use this function to get a connection and cursor whenever needed
+# Create the users table with a unique index on email
+def create_users_table(conn):
+    """
+    Older tables that already hold duplicate emails are left as they are, without
+    the index, until migrate_duplicate_users is run on purpose
+    (python login_signup.py migrate-duplicate-users).
+    """
+    global _users_table_ready
+    conn.execute("CREATE TABLE IF NOT EXISTS users (name TEXT, email TEXT)")
+    index_exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type='index' AND name='idx_users_email'").fetchone()
+    if not index_exists:
+        duplicates = conn.execute("SELECT COUNT(email) - COUNT(DISTINCT email) FROM users").fetchone()[0]
+        if duplicates:
+            print(f"users.db has {duplicates} duplicate signups; idx_users_email is not created until "
+                  "'python login_signup.py migrate-duplicate-users' is run.", file=sys.stderr)
+        else:
+            conn.execute("CREATE UNIQUE INDEX idx_users_email ON users (email)")
+    conn.commit()
+    _users_table_ready = True
+
+# Migration for tables created before the unique index: keep the first row per email, report the rest, then add the index
+def migrate_duplicate_users(conn):
+    """
+    Only run on request, never when a connection is opened. Deletes every later
+    signup of an already registered email, prints each removed row and creates
+    idx_users_email. Returns the removed (name, email) rows.
+    """
+    duplicates = conn.execute("""
+        SELECT rowid, name, email FROM users
+        WHERE email IS NOT NULL AND rowid NOT IN (SELECT MIN(rowid) FROM users GROUP BY email)
+        ORDER BY rowid
+    """).fetchall()
+    for rowid, name, email in duplicates:
+        print(f"Removing duplicate user {name!r} <{email}> (row {rowid}); the first account for this email is kept.")
+    conn.executemany("DELETE FROM users WHERE rowid = ?", [(rowid,) for rowid, _, _ in duplicates])
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email ON users (email)")
+    conn.commit()
+    print(f"Removed {len(duplicates)} duplicate users and created idx_users_email.")
+    return [(name, email) for _, name, email in duplicates]
+
+# Look up a user by email, serving recently authenticated users from the in-process cache
 def user_exists(email):
+    with _user_cache_lock:
+        cached = _user_cache.get(email)
+        if cached and time.monotonic() - cached[0] < USER_CACHE_TTL:
+            _user_cache.move_to_end(email)
+            return cached[1]
+
     conn = get_db_connection()
     c = conn.cursor()
-    c.execute("SELECT * FROM users WHERE email=?", (email,))
+    c.execute("SELECT name, email FROM users WHERE email=?", (email,))
     user = c.fetchone()
     c.close()
     conn.close()
+
+    # Only found users are cached, so a signup from another process is seen immediately
+    if user:
+        with _user_cache_lock:
+            _user_cache[email] = (time.monotonic(), user)
+            _user_cache.move_to_end(email)
+            while len(_user_cache) > USER_CACHE_SIZE:
+                _user_cache.popitem(last=False)
     return user
 
+# Insert a new user; returns False if the email is already registered
 def add_user(name, email):
+    # One statement, so concurrent signups cannot both succeed even on an unmigrated table without the unique index
     conn = get_db_connection()
     c = conn.cursor()
-    c.execute("INSERT INTO users (name, email) VALUES (?, ?)", (name, email))
-    conn.commit()
-    c.close()
-    conn.close()
+    try:
+        c.execute("INSERT INTO users (name, email) SELECT ?, ? WHERE NOT EXISTS (SELECT 1 FROM users WHERE email = ?)", (name, email, email))
+        conn.commit()
+        return c.rowcount == 1
+    except sqlite3.IntegrityError:
+        return False
+    finally:
+        c.close()
+        conn.close()
 
 # Layout for the login/signup page
 def login_signup_layout():
@@ -62,17 +136,29 @@ def signup():
     name = st.text_input("Enter your name", key="signup_name")
     email = st.text_input("Enter your email", key="signup_email")
     if st.button("Sign Up"):
-        if user_exists(email):
+        if not add_user(name, email):
             st.warning("User already exists. Please login instead.")
         else:
-            add_user(name, email)
             st.success(f"Account created for {name}. You can now log in.")
             st.session_state['logged_in'] = True
             st.session_state['name'] = name
             st.session_state['email'] = email
 
-# Main function to show the layout
-if __name__ == "__main__":
+# Logout function
+def logout():
+    with _user_cache_lock:
+        _user_cache.pop(st.session_state.get('email'), None)
+    for key in ('logged_in', 'name', 'email'):
+        st.session_state.pop(key, None)
+    st.rerun()
+
+# Main function to show the layout (or run the duplicate-user migration: python login_signup.py migrate-duplicate-users)
+if __name__ == "__main__" and sys.argv[1:] == ["migrate-duplicate-users"]:
+    conn = sqlite3.connect('users.db')
+    conn.execute("CREATE TABLE IF NOT EXISTS users (name TEXT, email TEXT)")
+    migrate_duplicate_users(conn)
+    conn.close()
+elif __name__ == "__main__":
     if 'logged_in' not in st.session_state:
         st.session_state['logged_in'] = False
 
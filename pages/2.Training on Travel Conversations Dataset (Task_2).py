@@ -5,16 +5,15 @@ import os
 import pandas as pd
 from datetime import datetime, timedelta
 import re
-from utils import preprocess, extract_entities_with_bert, predict_intent_with_model, word_count, load_model, clean_entities, classify_entities
+import sqlite3
+from utils import preprocess, extract_entities_with_bert, predict_intent_with_model, word_count, load_model, clean_entities, classify_entities, create_connection
+from travel_db import ensure_price_aggregates, answer_price_question
+from dataset_cache import load_datasets
 
-# Load datasets
-@st.cache_resource
+# Load datasets from the memory-mapped columnar cache (converted once, shared process-wide; see dataset_cache.py)
 def load_data():
-    car_rental_data = pd.read_csv('synthetic_car_rental_data.csv')
-    flight_data = pd.read_csv('synthetic_flight_data.csv')
-    hotel_data = pd.read_csv('synthetic_hotel_data.csv')
-    travel_advisory_data = pd.read_csv('synthetic_travel_advisories.csv')
-    return car_rental_data, flight_data, hotel_data, travel_advisory_data
+    return load_datasets('synthetic_car_rental_data.csv', 'synthetic_flight_data.csv',
+                         'synthetic_hotel_data.csv', 'synthetic_travel_advisories.csv')
 
 car_rental_data, flight_data, hotel_data, travel_advisory_data = load_data()
 
@@ -210,8 +209,40 @@ def response_generator(response):
         yield word + " "
         time.sleep(0.05)
 
+# Function to answer price questions from the materialized price statistics in the travel database
+def get_price_answer(intent, query_input, locations):
+    category = {"flight": "flight", "hotel": "hotel", "car": "car_rental"}.get(intent.split('_')[0])
+    if not category or not locations:
+        return None
+
+    # Narrow the statistics to the month mentioned, if any ('YYYY-MM', or a month number for "in October")
+    month = None
+    dates, months = extract_dates(query_input)
+    if dates:
+        month = dates[0][:7]
+    elif months:
+        if ' ' in months[0]:
+            month = datetime.strptime(months[0], '%B %Y').strftime('%Y-%m')
+        else:
+            month = datetime.strptime(months[0], '%B').month
+
+    conn = create_connection()
+    try:
+        ensure_price_aggregates(conn)
+        return answer_price_question(conn, category, query_input, locations, month)
+    except sqlite3.Error as e:
+        print(f"Error reading price statistics: {e}")
+        return None
+    finally:
+        conn.close()
+
 # Function to extract relevant data from the datasets
 def extract_values_from_data(intent, query_input, locations, entities):
+    # Price questions ("cheapest flight Delhi to Mumbai in October") are answered from the price statistics
+    price_answer = get_price_answer(intent, query_input, locations)
+    if price_answer:
+        return price_answer
+
     if intent == "car_rental":
         matched_data = car_rental_data[car_rental_data['City'].str.lower().isin([loc.lower() for loc in locations])]
         if not matched_data.empty:
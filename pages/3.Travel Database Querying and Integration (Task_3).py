@@ -13,6 +13,16 @@ from utils import (
     load_model,
     create_connection,
 )
+from travel_db import (
+    ensure_interval_indexes,
+    ensure_fts_indexes,
+    ensure_price_aggregates,
+    overlap_query,
+    text_search_query,
+    answer_price_question,
+    PagedQuery,
+)
+from query_log import log_user_query, get_query_logger
 
 # Check if user is logged in and redirect to login if not
 def check_login():
@@ -32,27 +42,23 @@ vectorizer, service_classifier = load_model()
 
 # Create a database connection
 conn = create_connection()
-cursor = conn.cursor()
-
-# Create table for storing user queries if not exists
-cursor.execute("""
-    CREATE TABLE IF NOT EXISTS user_queries (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_query TEXT,
-        intent TEXT,
-        locations TEXT,
-        dates TEXT
-    )
-""")
-conn.commit()
 
-# Function to store user query in the database
+# Build the interval indexes, full-text indexes and price statistics if this database predates them
+ensure_interval_indexes(conn)
+ensure_fts_indexes(conn)
+ensure_price_aggregates(conn)
+
+# Function to store user query in the database (queued and written in batches by the background query logger)
 def store_user_query(query, intent, locations, dates):
-    cursor.execute("""
-        INSERT INTO user_queries (user_query, intent, locations, dates)
-        VALUES (?, ?, ?, ?)
-    """, (query, intent, ', '.join(locations), ', '.join([date[1].strftime('%Y-%m-%d') for date in dates])))
-    conn.commit()
+    log_user_query(st.session_state.get('email'), query, intent, ', '.join(locations),
+                   ', '.join([date[1].strftime('%Y-%m-%d') for date in dates]))
+
+# Show how far behind the query logger is, to confirm logging stays off the request path
+with st.sidebar.expander("Query log status"):
+    log_stats = get_query_logger().stats()
+    st.write(f"Queue depth: {log_stats['queue_depth']}")
+    st.write(f"Written: {log_stats['written']} in {log_stats['flushes']} batches (dropped: {log_stats['dropped']})")
+    st.write(f"Flush latency: avg {log_stats['avg_flush_ms']:.1f} ms, max {log_stats['max_flush_ms']:.1f} ms")
 
 st.title("Task 3: Database Query with Chatbot Interface")
 
@@ -157,6 +163,52 @@ def get_like_term(entity_type, entities):
             return f"%{entity['word']}%"
     return None
 
+if 'task3_results' not in st.session_state:
+    st.session_state.task3_results = {}
+
+# Function to remember a paged query so its results survive reruns (e.g. when the user pages through them)
+def set_paged_results(panel, title, query, empty_message=None):
+    st.session_state.task3_results[panel] = {
+        "title": title,
+        "query": query,
+        "empty_message": empty_message,
+        "page_keys": [None],  # The "after" key of every page visited so far, current page last
+    }
+
+# Function to display one page of a remembered query with Previous/Next buttons
+def show_paged_results(panel):
+    state = st.session_state.task3_results.get(panel)
+    if not state:
+        return
+    query = state["query"]
+    if query is None:
+        if state["empty_message"]:
+            st.write(state["empty_message"])
+        return
+
+    page_keys = state["page_keys"]
+    rows, next_key = query.page(conn, page_keys[-1])
+    if not rows:
+        if state["empty_message"]:
+            st.write(state["empty_message"])
+        return
+
+    count, exact = query.count_estimate(conn)
+    first_row = (len(page_keys) - 1) * query.page_size + 1
+    st.write(state["title"])
+    st.dataframe(pd.DataFrame(rows, columns=query.columns), use_container_width=True)
+    st.caption(f"Showing rows {first_row}-{first_row + len(rows) - 1} of {count if exact else f'{count}+'}")
+
+    col_prev, col_next = st.columns(2)
+    with col_prev:
+        if len(page_keys) > 1 and st.button("Previous page", key=f"{panel}_prev_page"):
+            page_keys.pop()
+            st.rerun()
+    with col_next:
+        if next_key is not None and st.button("Next page", key=f"{panel}_next_page"):
+            page_keys.append(next_key)
+            st.rerun()
+
 # Process user query
 if query_task_3:
     if word_count(query_task_3) < 4:
@@ -191,106 +243,70 @@ if query_task_3:
         if dates:
             bot_reply += f" The **date(s)** mentioned: {', '.join([date[1].strftime('%Y-%m-%d') for date in dates])}."
 
-        # Query the database based on predicted service and extracted entities
-        result_data = None  # Placeholder for query result
-        result_columns = []  # Placeholder for column headers
+        # Answer price questions directly from the materialized price statistics
+        price_answer = answer_price_question(conn, category, query_task_3, locations,
+                                             dates[0][1].strftime('%Y-%m') if dates else None)
+        if price_answer:
+            bot_reply += f" {price_answer}"
+
+        # Build a paged query based on predicted service and extracted entities
+        result_query = None
 
         if category == 'flight' and len(locations) >= 2:
             origin, destination = locations[0], locations[1]
             airline_like = get_like_term('I-ORG', entities)
+            conditions = ["LOWER(t.Source)=LOWER(:origin)", "LOWER(t.Destination)=LOWER(:destination)",
+                          "(LOWER(t.Airline) LIKE :airline OR :airline IS NULL)"]
+            params = {"origin": origin, "destination": destination, "airline": airline_like}
 
             if dates:
-                date = dates[0][1].strftime('%Y-%m')
-                cursor.execute("""
-                    SELECT * FROM flight 
-                    WHERE LOWER(Source)=LOWER(?) AND LOWER(Destination)=LOWER(?) 
-                      AND strftime('%Y-%m', Date_of_Journey)=? 
-                      AND (LOWER(Airline) LIKE ? OR ? IS NULL)
-                """, (origin, destination, date, airline_like, airline_like))
-            else:
-                cursor.execute("""
-                    SELECT * FROM flight 
-                    WHERE LOWER(Source)=LOWER(?) AND LOWER(Destination)=LOWER(?) 
-                      AND (LOWER(Airline) LIKE ? OR ? IS NULL)
-                """, (origin, destination, airline_like, airline_like))
-            flights_data = cursor.fetchall()
-
-            if flights_data:
-                result_data = flights_data
-                result_columns = ["Airline", "Source", "Destination", "Date_of_Journey", "Dep_Time", "Duration", "Total_Stops", "Price", "Additional_Info", "Arrival_Time"]
-            else:
+                conditions.append("strftime('%Y-%m', t.Date_of_Journey)=:month")
+                params["month"] = dates[0][1].strftime('%Y-%m')
+            result_query = PagedQuery("flight", conditions, params)
+
+            if not result_query.exists(conn):
+                result_query = None
                 bot_reply += " No flights found for the given criteria."
 
         elif category == 'hotel' and len(locations) >= 1:
                 city = locations[0]
                 room_type_like = get_like_term('I-ROOM', entities)  # Room type term
+                conditions = ["LOWER(t.City)=LOWER(:city)", "(LOWER(t.Room_Type) LIKE :room_type OR :room_type IS NULL)"]
+                params = {"city": city, "room_type": room_type_like}
 
                 if dates and len(dates) >= 2:
                     # Assuming dates[0] is the start date and dates[1] is the end date for 'next week'
-                    start_date = dates[0][1].strftime('%Y-%m-%d')
-                    end_date = dates[1][1].strftime('%Y-%m-%d')
-                    
-                    cursor.execute("""
-                        SELECT * FROM hotel 
-                        WHERE LOWER(City)=LOWER(?) 
-                          AND Check_In_Date BETWEEN ? AND ?
-                          AND (LOWER(Room_Type) LIKE ? OR ? IS NULL)
-                    """, (city, start_date, end_date, room_type_like, room_type_like))
-                else:
-                    cursor.execute("""
-                        SELECT * FROM hotel 
-                        WHERE LOWER(City)=LOWER(?) 
-                          AND (LOWER(Room_Type) LIKE ? OR ? IS NULL)
-                    """, (city, room_type_like, room_type_like))
-                
-                hotels_data = cursor.fetchall()
-
-                if hotels_data:
-                    result_data = hotels_data
-                    result_columns = ["Hotel_Name", "City", "Check_In_Date", "Room_Type", "Price_Per_Night", "Availability_Status", "Additional_Info", "Check_Out_Date", "Total_Nights"]
-                else:
-                    bot_reply += " No hotels found for the given criteria."
-
+                    conditions.append("t.Check_In_Date BETWEEN :start_date AND :end_date")
+                    params["start_date"] = dates[0][1].strftime('%Y-%m-%d')
+                    params["end_date"] = dates[1][1].strftime('%Y-%m-%d')
+                result_query = PagedQuery("hotel", conditions, params)
 
+                if not result_query.exists(conn):
+                    result_query = None
+                    bot_reply += " No hotels found for the given criteria."
 
         elif category == 'car_rental' and len(locations) >= 1:
             city = locations[0]
             car_type_like = get_like_term('I-CAR', entities)  # Car type term
+            conditions = ["LOWER(t.City)=LOWER(:city)", "(LOWER(t.Car_Type) LIKE :car_type OR :car_type IS NULL)"]
+            params = {"city": city, "car_type": car_type_like}
 
             if dates:
-                date = dates[0][1].strftime('%Y-%m-%d')
-                cursor.execute("""
-                    SELECT * FROM car_rental 
-                    WHERE LOWER(City)=LOWER(?) AND Pickup_Date=? 
-                      AND (LOWER(Car_Type) LIKE ? OR ? IS NULL)
-                """, (city, date, car_type_like, car_type_like))
-            else:
-                cursor.execute("""
-                    SELECT * FROM car_rental 
-                    WHERE LOWER(City)=LOWER(?) 
-                      AND (LOWER(Car_Type) LIKE ? OR ? IS NULL)
-                """, (city, car_type_like, car_type_like))
-            car_rental_data = cursor.fetchall()
-
-            if car_rental_data:
-                result_data = car_rental_data
-                result_columns = ["Car_Rental_Company", "City", "Pickup_Date", "Car_Type", "Price_Per_Day", "Availability_Status", "Additional_Info", "Return_Date", "Total_Days"]
-            else:
+                conditions.append("t.Pickup_Date=:pickup_date")
+                params["pickup_date"] = dates[0][1].strftime('%Y-%m-%d')
+            result_query = PagedQuery("car_rental", conditions, params)
+
+            if not result_query.exists(conn):
+                result_query = None
                 bot_reply += f" No car rentals found in {city}."
 
-        elif category == 'travel_advisory' and len(locations) >= 1:
-            city = locations[0]
-            cursor.execute("""
-                SELECT * FROM travel_advisory 
-                WHERE LOWER(City)=LOWER(?)
-            """, (city,))
-            advisories_data = cursor.fetchall()
-
-            if advisories_data:
-                result_data = advisories_data
-                result_columns = ["City", "Advisory_Date", "Advisory_Level", "Reason", "Affected_Routes", "Additional_Info", "Validity"]
-            else:
-                bot_reply += " No advisories found for the given location."
+        elif category == 'travel_advisory':
+            # Rank advisories by how well their city, reason, routes and details match the whole query
+            result_query = text_search_query("travel_advisory", query_task_3)
+
+            if result_query is None or not result_query.exists(conn):
+                result_query = None
+                bot_reply += " No advisories found for the given query."
 
         else:
             bot_reply += " Sorry, I couldn't find enough information to answer your query."
@@ -302,12 +318,12 @@ if query_task_3:
         with st.chat_message("assistant"):
             st.markdown(bot_reply)
 
-        # Display the result data in a full-width container below the query options
-        if result_data:
-            st.write("### Results")
-            with st.container():
-                result_df = pd.DataFrame(result_data, columns=result_columns)
-                st.dataframe(result_df, use_container_width=True)
+        # Remember the result query so its pages can be browsed on later reruns
+        set_paged_results("chat", "### Results", result_query)
+
+# Display the result data in a full-width container below the chat
+with st.container():
+    show_paged_results("chat")
 
 # Cities list
 cities = ['Mumbai', 'Delhi', 'Bangalore', 'Hyderabad', 'Chennai', 'Kolkata', 'Pune', 'Jaipur']
@@ -332,7 +348,6 @@ with st.container():
     col_button = st.columns([1])
     with col_button[0]:
         if st.button("Query Flights"):
-            flights_data = None
             if origin_flight and destination_flight:
                 query_flight = f"Show me available flights from {origin_flight} to {destination_flight}."
                 intent = 'flight_inquiry'
@@ -341,22 +356,18 @@ with st.container():
                 # Store flight query in the database
                 store_user_query(query_flight, intent, locations, dates)
 
+                conditions = ["LOWER(t.Source)=LOWER(:origin)", "LOWER(t.Destination)=LOWER(:destination)"]
+                params = {"origin": origin_flight, "destination": destination_flight}
                 if from_date_flight and to_date_flight:
-                    cursor.execute("SELECT * FROM flight WHERE LOWER(Source)=LOWER(?) AND LOWER(Destination)=LOWER(?) AND Date_of_Journey BETWEEN ? AND ?", 
-                                   (origin_flight, destination_flight, from_date_flight.strftime("%Y-%m-%d"), to_date_flight.strftime("%Y-%m-%d")))
+                    conditions.append("t.Date_of_Journey BETWEEN :from_date AND :to_date")
+                    params["from_date"] = from_date_flight.strftime("%Y-%m-%d")
+                    params["to_date"] = to_date_flight.strftime("%Y-%m-%d")
                 elif from_date_flight:
-                    cursor.execute("SELECT * FROM flight WHERE LOWER(Source)=LOWER(?) AND LOWER(Destination)=LOWER(?) AND Date_of_Journey >= ?", 
-                                   (origin_flight, destination_flight, from_date_flight.strftime("%Y-%m-%d")))
-                else:
-                    cursor.execute("SELECT * FROM flight WHERE LOWER(Source)=LOWER(?) AND LOWER(Destination)=LOWER(?)", 
-                                   (origin_flight, destination_flight))
-                flights_data = cursor.fetchall()
-                if flights_data:
-                    flight_df = pd.DataFrame(flights_data, columns=["Airline", "Source", "Destination", "Date_of_Journey", "Dep_Time", "Duration", "Total_Stops", "Price", "Additional_Info", "Arrival_Time"])
-                    st.write("### Available Flights:")
-                    st.dataframe(flight_df, use_container_width=True)
-                else:
-                    st.write("No flights available for the selected route.")
+                    conditions.append("t.Date_of_Journey >= :from_date")
+                    params["from_date"] = from_date_flight.strftime("%Y-%m-%d")
+                set_paged_results("flights", "### Available Flights:", PagedQuery("flight", conditions, params),
+                                  "No flights available for the selected route.")
+    show_paged_results("flights")
 
 # Horizontal layout for Query Hotels
 with st.container():
@@ -383,25 +394,15 @@ with st.container():
             # Store hotel query in the database
             store_user_query(query_hotel, intent, locations, dates)
 
-            hotels_data = None
-            if from_date_hotel and to_date_hotel:
-                # Query between the two dates
-                cursor.execute("SELECT * FROM hotel WHERE LOWER(City)=LOWER(?) AND Check_In_Date<=? AND Check_Out_Date>=?", 
-                               (location_hotel, to_date_hotel_str, from_date_hotel_str))
-            elif from_date_hotel:
-                # Query from a specific date onwards
-                cursor.execute("SELECT * FROM hotel WHERE LOWER(City)=LOWER(?) AND Check_Out_Date>=?", (location_hotel, from_date_hotel_str))
+            if from_date_hotel:
+                # Stays overlapping the date window (open-ended if no 'To Date'), answered by the interval index
+                hotels_query = overlap_query(conn, "hotel", location_hotel, from_date_hotel_str, to_date_hotel_str)
             else:
                 # Query without any date restrictions
-                cursor.execute("SELECT * FROM hotel WHERE LOWER(City)=LOWER(?)", (location_hotel,))
-            
-            hotels_data = cursor.fetchall()
-            if hotels_data:
-                hotel_df = pd.DataFrame(hotels_data, columns=["Hotel_Name", "City", "Check_In_Date", "Room_Type", "Price_Per_Night", "Availability_Status", "Additional_Info", "Check_Out_Date", "Total_Nights"])
-                st.write("### Available Hotels:")
-                st.dataframe(hotel_df, use_container_width=True)
-            else:
-                st.write("No hotels available in the selected location and date range.")
+                hotels_query = PagedQuery("hotel", ["LOWER(t.City)=LOWER(:city)"], {"city": location_hotel})
+            set_paged_results("hotels", "### Available Hotels:", hotels_query,
+                              "No hotels available in the selected location and date range.")
+    show_paged_results("hotels")
 
 # Horizontal layout for Query Car Rentals
 with st.container():
@@ -425,37 +426,25 @@ with st.container():
             # Store car rental query in the database
             store_user_query(query_car, intent, locations, dates)
 
-            car_rental_data = None
             if location_car:
-                if from_date_car and to_date_car:
-                    cursor.execute("""
-                        SELECT * FROM car_rental 
-                        WHERE LOWER(City)=LOWER(?) 
-                        AND Pickup_Date BETWEEN ? AND ?
-                    """, (location_car, from_date_car.strftime("%Y-%m-%d"), to_date_car.strftime("%Y-%m-%d")))
-                elif from_date_car:
-                    cursor.execute("""
-                        SELECT * FROM car_rental 
-                        WHERE LOWER(City)=LOWER(?) 
-                        AND Pickup_Date >= ?
-                    """, (location_car, from_date_car.strftime("%Y-%m-%d")))
+                if from_date_car:
+                    # Rentals whose pickup/return period overlaps the date window, answered by the interval index
+                    car_rental_query = overlap_query(conn, "car_rental", location_car, from_date_car.strftime("%Y-%m-%d"),
+                                                     to_date_car.strftime("%Y-%m-%d") if to_date_car else None)
                 else:
-                    cursor.execute("SELECT * FROM car_rental WHERE LOWER(City)=LOWER(?)", (location_car,))
-                
-                car_rental_data = cursor.fetchall()
-                if car_rental_data:
-                    car_rental_df = pd.DataFrame(car_rental_data, columns=["Car_Rental_Company", "City", "Pickup_Date", "Car_Type", "Price_Per_Day", "Availability_Status", "Additional_Info", "Return_Date", "Total_Days"])
-                    st.write("### Available Car Rentals:")
-                    st.dataframe(car_rental_df, use_container_width=True)
-                else:
-                    st.write(f"No car rentals available in {location_car}.")
+                    car_rental_query = PagedQuery("car_rental", ["LOWER(t.City)=LOWER(:city)"], {"city": location_car})
+                set_paged_results("car_rentals", "### Available Car Rentals:", car_rental_query,
+                                  f"No car rentals available in {location_car}.")
+    show_paged_results("car_rentals")
 
 # Horizontal layout for Query Travel Advisories
 with st.container():
     st.write("#### Query Travel Advisories")
-    col14 = st.columns(1)
-    with col14[0]:
+    col14, col15 = st.columns(2)
+    with col14:
         location_advisory = st.selectbox("Location for advisories:", options=cities, key="location_advisory")
+    with col15:
+        keywords_advisory = st.text_input("Keywords (optional)", placeholder="e.g. weather Pune to Bangalore", key="keywords_advisory")
     
     col_button = st.columns([1])
     with col_button[0]:
@@ -467,17 +456,17 @@ with st.container():
             # Store travel advisory query in the database
             store_user_query(query_advisory, intent, locations, dates)
 
-            advisories_data = None
             if location_advisory:
-                cursor.execute("SELECT * FROM travel_advisory WHERE LOWER(City)=LOWER(?)", (location_advisory,))
-                advisories_data = cursor.fetchall()
-
-                if advisories_data:
-                    advisory_df = pd.DataFrame(advisories_data, columns=["City", "Advisory_Date", "Advisory_Level", "Reason", "Affected_Routes", "Additional_Info", "Validity"])
-                    st.write("### Available Advisories:")
-                    st.dataframe(advisory_df, use_container_width=True)
-                else:
-                    st.write(f"No advisories available in {location_advisory}.")
+                advisories_query = None
+                if keywords_advisory:
+                    # Keywords are matched against the full-text index and ranked by relevance
+                    advisories_query = text_search_query("travel_advisory", keywords_advisory,
+                                                         ["LOWER(t.City)=LOWER(:city)"], {"city": location_advisory})
+                if advisories_query is None:
+                    advisories_query = PagedQuery("travel_advisory", ["LOWER(t.City)=LOWER(:city)"], {"city": location_advisory})
+                set_paged_results("advisories", "### Available Advisories:", advisories_query,
+                                  f"No advisories available in {location_advisory}.")
+    show_paged_results("advisories")
 
 # Commit changes to the database
 conn.commit()
@@ -1,7 +1,8 @@
 import streamlit as st
-from utils import get_flight_offers, get_hotel_list_by_city, get_car_rentals,get_vehicle_details_by_car_id,get_hotel_details_by_id
+from utils import get_flight_offers, get_hotel_list_by_city, get_car_rentals,get_vehicle_details_by_car_id,get_hotel_details_by_id,get_hotel_details_by_ids
 from datetime import datetime, timedelta
 import time
+from local_fallback import INR_PER_EUR
 
 
 
@@ -94,10 +95,9 @@ def format_duration(duration_iso):
     minutes = (duration.total_seconds() % 3600) // 60
     return f"{int(hours)}h {int(minutes)}m"
 
-# Convert price to INR (Assuming 1 EUR = 110 INR for demonstration purposes)
+# Convert price to INR at the same fixed rate the local fallback uses for its EUR offers
 def convert_to_inr(eur_price):
-    conversion_rate = 110  # Example conversion rate
-    inr_price = float(eur_price) * conversion_rate
+    inr_price = float(eur_price) * INR_PER_EUR
     return f"{inr_price:.2f} INR"
 
 # Function to calculate the layover duration
@@ -144,18 +144,24 @@ if service_choice == "Hotel List":
     
     if st.button("Search Hotels by City"):
         with st.spinner("Fetching hotel data... Please wait a moment."):
-            time.sleep(1)  # Simulate delay for API fetching
             hotel_list_data = get_hotel_list_by_city(city)
         
         if "error" in hotel_list_data:
             st.error(hotel_list_data['error'])
         else:
+            if hotel_list_data.get("fallback"):
+                st.info("Live hotel data is unavailable right now, so these results come from our local travel database.")
             if "data" in hotel_list_data:
                 hotels = hotel_list_data["data"][:10]  # Limiting to 10 results
+                # Details for all listed hotels in one request (local fallback hotels have none)
+                hotel_details = {} if hotel_list_data.get("fallback") else get_hotel_details_by_ids([hotel["hotelId"] for hotel in hotels if hotel.get("hotelId")])
                 for hotel in hotels:
                     hotel_name = hotel.get("name", "N/A")
                     address = hotel.get("address", {}).get("countryCode", "N/A")
                     hotel_id = hotel.get("hotelId", "N/A")
+                    details = (hotel_details.get(hotel_id, {}).get("data") or [{}])[0]
+                    geo_code = details.get("geoCode", {})
+                    location = f"{geo_code['latitude']}, {geo_code['longitude']}" if "latitude" in geo_code and "longitude" in geo_code else "N/A"
 
                     # Display the hotel information (without sentiments)
                     hotel_html = f"""
@@ -164,6 +170,7 @@ if service_choice == "Hotel List":
                             <h5 class="card-title">{hotel_name}</h5>
                             <p class="card-text"><strong>Address:</strong> {address}</p>
                             <p class="card-text"><strong>Hotel ID:</strong> {hotel_id}</p>
+                            <p class="card-text"><strong>Location:</strong> {location}</p>
                         </div>
                     </div>
                     """
@@ -213,6 +220,8 @@ elif service_choice == "Flight Booking":
                 if "error" in flight_data:
                     st.error(flight_data['error'])
                 else:
+                    if flight_data.get("fallback"):
+                        st.info("Live flight data is unavailable right now, so these results come from our local travel database.")
                     if "data" in flight_data:
                         offers = flight_data["data"][:10]
                         for offer in offers:
@@ -285,6 +294,8 @@ elif service_choice == "Car Rental":
         if "error" in car_data:
             st.error(car_data['error'])
         else:
+            if car_data.get("fallback"):
+                st.info("Live car rental data is unavailable right now, so these results come from our local travel database.")
             if "data" in car_data:
                 cars = car_data["data"][:15]  # Limit to 25 results
                 for car in cars:
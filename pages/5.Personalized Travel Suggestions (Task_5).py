@@ -1,6 +1,7 @@
 import streamlit as st
-import pandas as pd
 from utils import create_connection, fetch_amadeus_recommendations,get_flight_offers
+from query_log import create_user_queries_table, get_user_top_locations
+from dataset_cache import load_datasets
 import login_signup
 import random
 
@@ -57,24 +58,18 @@ Let's dive into your tailored travel suggestions! Select an option below or view
 
 # Connect to the database
 conn = create_connection()
-cursor = conn.cursor()
 
-# Query stored user data from the user_queries table
-cursor.execute("SELECT * FROM user_queries")
-stored_queries = cursor.fetchall()
+# Read the logged-in user's most searched location per intent category from their preference profile
+create_user_queries_table(conn)
+user_top_locations = get_user_top_locations(conn, st.session_state.get('email'))
 
-# Assuming the columns as 'user_query', 'intent', 'locations', and 'dates'
-stored_queries_df = pd.DataFrame(stored_queries, columns=['id', 'user_query', 'intent', 'locations', 'dates'])
+# Load flight, hotel, car rental, travel advisory, and recommendations data from the memory-mapped columnar cache
+flight_df, hotel_df, car_rental_df, travel_advisory_df, recommendations_df = load_datasets(
+    "synthetic_flight_data.csv", "synthetic_hotel_data.csv", "synthetic_car_rental_data.csv",
+    "synthetic_travel_advisories.csv", "large_user_recommendations.csv")
 
-# Load external data files for flight, hotel, car rental, travel advisory, and recommendations
-flight_df = pd.read_csv("synthetic_flight_data.csv")
-hotel_df = pd.read_csv("synthetic_hotel_data.csv")
-car_rental_df = pd.read_csv("synthetic_car_rental_data.csv")
-travel_advisory_df = pd.read_csv("synthetic_travel_advisories.csv")
-recommendations_df = pd.read_csv("large_user_recommendations.csv")
-
-# Ensure columns match expected values in recommendations dataframe
-recommendations_df.columns = recommendations_df.columns.str.lower()
+# Ensure columns match expected values in recommendations dataframe (renamed on a new frame; the cached one is shared)
+recommendations_df = recommendations_df.rename(columns=str.lower)
 
 # Randomized suggestion generator for natural responses
 def get_random_suggestion():
@@ -88,25 +83,13 @@ def get_random_suggestion():
     ]
     return random.choice(suggestions)
 
-# Function to fetch most common location for a specific intent type
-def get_most_common_location(stored_queries_df, intent_list):
-    filtered_queries = stored_queries_df[stored_queries_df['intent'].isin(intent_list)]
-    if not filtered_queries.empty:
-        return filtered_queries['locations'].value_counts().idxmax()  # Most searched location
-    return None
-
 # Function to recommend based on user history, with conversational responses
-def recommend_based_on_user_history(stored_queries_df):
-    flight_intents = ['flight_booking', 'flight_inquiry', 'flight_cancellation', 'flight_status', 'flight_change']
-    hotel_intents = ['hotel_booking', 'hotel_inquiry', 'hotel_cancellation', 'hotel_upgrade', 'hotel_amenities']
-    car_rental_intents = ['car_rental', 'car_inquiry', 'car_cancellation', 'car_extension', 'car_price']
-    advisory_intents = ['travel_advisory', 'weather_advisory', 'health_advisory', 'political_unrest_advisory', 'covid_restrictions']
-
-    # Fetch most common locations based on intent types
-    most_common_flight_location = get_most_common_location(stored_queries_df, flight_intents)
-    most_common_hotel_location = get_most_common_location(stored_queries_df, hotel_intents)
-    most_common_car_rental_location = get_most_common_location(stored_queries_df, car_rental_intents)
-    most_common_advisory_location = get_most_common_location(stored_queries_df, advisory_intents)
+def recommend_based_on_user_history(user_top_locations):
+    # Most common locations based on intent types
+    most_common_flight_location = user_top_locations['flight']
+    most_common_hotel_location = user_top_locations['hotel']
+    most_common_car_rental_location = user_top_locations['car_rental']
+    most_common_advisory_location = user_top_locations['travel_advisory']
 
     # Display a chat message like in your example
     with st.chat_message("assistant"):
@@ -242,7 +225,7 @@ def recommend_based_on_user_history(stored_queries_df):
             st.write("No additional general recommendations at the moment.")
 
 # Recommend based on user's query history
-recommend_based_on_user_history(stored_queries_df)
+recommend_based_on_user_history(user_top_locations)
 
 # Commit and close the connection
 conn.commit()
@@ -3,7 +3,12 @@ import sqlite3
 import pandas as pd
 from datetime import datetime, timedelta
 import login_signup
-from utils import get_flight_offers, get_hotel_list_by_city, get_car_rentals, get_vehicle_details_by_car_id
+from utils import get_flight_offers, get_hotel_list_by_city, get_car_rentals, get_vehicle_details_by_car_id, amadeus_tokens, amadeus_rate_limiter, amadeus_breaker, zoomcar_breaker
+from api_client import http_client
+from local_fallback import INR_PER_EUR
+import booking_store
+from api_cache import get_api_cache
+from booking_store import create_bookings_table, fetch_booking_history, fetch_cancellable_bookings, cancel_booking, get_cancellation_sweeper
 
 # Check if user is logged in and redirect to login if not
 def check_login():
@@ -22,28 +27,32 @@ check_login()
 conn = sqlite3.connect('travel_booking.db', check_same_thread=False)
 c = conn.cursor()
 
-# Create tables for API data caching and booking history
+# Create the booking history tables (API responses are cached by utils through api_cache)
 def setup_db():
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS api_data (
-            service_type TEXT,
-            response_data TEXT
-        )
-    ''')
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS bookings (
-            booking_id TEXT,
-            user_email TEXT,  -- Add user_email to track bookings by user
-            service_type TEXT,
-            details TEXT,
-            booking_date TEXT,
-            canceled INTEGER DEFAULT 0
-        )
-    ''')
-    conn.commit()
+    # Bookings live in an indexed table keyed by booking_id (see booking_store)
+    create_bookings_table(conn)
 
 setup_db()
 
+# Background thread that closes expired cancellation windows in bulk
+get_cancellation_sweeper()
+
+with st.sidebar.expander("API cache status"):
+    cache_stats = get_api_cache().stats()
+    st.write(f"Hits: {cache_stats['hits']}, misses: {cache_stats['misses']} (hit rate {cache_stats['hit_rate']:.0%})")
+    st.write(f"Entries: {cache_stats['entries']}, stored: {cache_stats['stored_bytes'] / 1024:.1f} KiB compressed")
+    st.write(f"Served from cache: {cache_stats['bytes_served'] / 1024:.1f} KiB")
+    st.write(f"Upstream calls saved by coalescing identical searches: {cache_stats['upstream_calls_saved']}")
+    token_stats = amadeus_tokens.stats()
+    st.write(f"Amadeus token fetches: {token_stats['fetches']} (avoided: {token_stats['fetches_avoided']})")
+    http_stats = http_client.stats()
+    st.write(f"Upstream requests: {http_stats['requests']} over {http_stats['sessions']} pooled sessions (retries: {http_stats['retries']})")
+    for breaker in (amadeus_breaker, zoomcar_breaker):
+        breaker_stats = breaker.stats()
+        st.write(f"{breaker.name}: circuit {breaker_stats['state']}, {breaker_stats['fallbacks']} searches served from local data")
+    limit_stats = amadeus_rate_limiter.stats()
+    st.write(f"Amadeus rate limit: {limit_stats['queued']} calls queued (avg wait {limit_stats['avg_wait_seconds']:.2f}s, max {limit_stats['max_wait_seconds']:.2f}s), {limit_stats['rejections']} rejected")
+
 # Greeting and Overview of Booking System
 st.title("🤖 Welcome to Travel Services!")
 if 'name' in st.session_state:  # Using 'name', not 'user_name'
@@ -59,58 +68,18 @@ st.markdown("""
 4. **Cancellation Policy**: Cancel bookings within **24 hours** of booking date if eligible.
 """)
 
-# Function to generate unique booking ID
-def generate_booking_id(service_type):
-    prefix = {'flight': 'FL', 'hotel': 'HL', 'car': 'CR'}
-    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-    return f"{prefix.get(service_type, 'XX')}{timestamp}"
-
-# Cache API data
-def cache_api_data(service_type, data):
-    c.execute("DELETE FROM api_data WHERE service_type=?", (service_type,))
-    c.execute("INSERT INTO api_data (service_type, response_data) VALUES (?, ?)", (service_type, str(data)))
-    conn.commit()
-
-# Fetch cached API data
-def fetch_cached_api_data(service_type):
-    c.execute("SELECT response_data FROM api_data WHERE service_type=?", (service_type,))
-    row = c.fetchone()
-    if row:
-        return eval(row[0])  # Convert string back to dict
-    return None
-
 # Store booking details in DB with a unique booking ID and user email
 def store_booking(service_type, details):
     if 'email' not in st.session_state:  # Using 'email', not 'user_email'
         st.error("User email is not available. Please log in.")
         return None
 
-    booking_id = generate_booking_id(service_type)
     user_email = st.session_state['email']  # Fetch user email from session state
-    c.execute("INSERT INTO bookings (booking_id, user_email, service_type, details, booking_date, canceled) VALUES (?, ?, ?, ?, ?, ?)",
-              (booking_id, user_email, service_type, str(details), datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 0))
-    conn.commit()
-    return booking_id
-
-# Fetch booking history for the logged-in user
-def fetch_booking_history(user_email, canceled=0):
-    c.execute("SELECT booking_id, service_type, details, booking_date FROM bookings WHERE user_email=? AND canceled=?", (user_email, canceled))
-    return c.fetchall()
-
-# Delete booking (Cancel)
-def cancel_booking(booking_id, user_email):
-    c.execute("UPDATE bookings SET canceled=1 WHERE booking_id=? AND user_email=?", (booking_id, user_email))
-    conn.commit()
+    return booking_store.store_booking(user_email, service_type, details)
 
 # Helper functions for handling API responses and pricing
 def convert_to_inr(eur_price):
-    conversion_rate = 110
-    return float(eur_price) * conversion_rate
-
-# Function to check if a booking is within 24 hours
-def is_within_24_hours(booking_date_str):
-    booking_date = datetime.strptime(booking_date_str, '%Y-%m-%d %H:%M:%S')
-    return (datetime.now() - booking_date).total_seconds() <= 24 * 3600
+    return float(eur_price) * INR_PER_EUR
 
 def calculate_hotel_price(room_type, num_days):
     room_prices = {"Single": 2000, "Double": 3500, "Suite": 6000, "Deluxe": 8000}
@@ -157,13 +126,15 @@ def flight_booking():
                     return_date.strftime('%Y-%m-%d') if return_date else None
                 )
                 
-                # Cache the flight data if available
+                # Keep this user's search results across reruns
                 if flight_data:
-                    cache_api_data('flight', flight_data)
+                    st.session_state.flight_data = flight_data
 
-        # After search or if cached data exists, show flight options
-        flight_data = fetch_cached_api_data('flight')
+        # After search, show flight options
+        flight_data = st.session_state.get('flight_data')
         if flight_data:
+            if flight_data.get("fallback"):
+                st.info("Live flight data is unavailable right now, so these results come from our local travel database.")
             offers = flight_data.get("data", [])[:5]
             flight_options = []
             for offer in offers:
@@ -209,6 +180,8 @@ def hotel_booking():
                 st.session_state.hotel_data = get_hotel_list_by_city(city)
 
     if 'hotel_data' in st.session_state:
+        if st.session_state.hotel_data.get("fallback"):
+            st.info("Live hotel data is unavailable right now, so these results come from our local travel database.")
         hotel_options = [f"{hotel['name']} - ID: {hotel['hotelId']}" for hotel in st.session_state.hotel_data["data"][:5]]
         selected_hotel = st.selectbox("Select a Hotel", hotel_options, key="hotel_selection")
 
@@ -276,13 +249,14 @@ def car_booking():
             if car_data and car_data.get("data"):
                 st.session_state.car_data = car_data
                 st.session_state.selected_car = None  # Reset the selected car if the user re-searches
-                cache_api_data('car', car_data)  # Cache the data to avoid multiple API calls
             else:
                 st.error("No cars available for the selected city.")
                 st.session_state.car_data = None
 
     # Ensure details are only shown after the user searches for cars
     if st.session_state.car_data and st.session_state.car_data.get("data"):
+        if st.session_state.car_data.get("fallback"):
+            st.info("Live car rental data is unavailable right now, so these results come from our local travel database.")
         # Show the car options with car name, vehicle number, and car ID
         car_options = [f"{car['brand']} - {car['name']} ({car['vehicleNumber']})" for car in st.session_state.car_data["data"][:15]]
         
@@ -334,10 +308,41 @@ def car_booking():
                 "payment_method": payment_method,
                 "booking_datetime": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             }
-            booking_id = generate_booking_id('car')  # Generate a unique booking ID
-            store_booking('car', booking_details)
+            booking_id = store_booking('car', booking_details)
             st.success(f"Car rental booked successfully! Booking ID: {booking_id}")
 
+# Format a booking's details for the history tables
+def format_booking_details(service_type, booking_dict):
+    formatted_details = ""
+    if service_type == 'flight':
+        formatted_details = (
+            f"Source: {booking_dict.get('source')}, "
+            f"Destination: {booking_dict.get('destination')}, "
+            f"Departure: {booking_dict.get('departure_date')}, "
+            f"Return: {booking_dict.get('return_date')}, "
+            f"Class: {booking_dict.get('travel_class')}, "
+            f"Flight: {booking_dict.get('selected_flight')}, "
+            f"Payment: {booking_dict.get('payment_method')}"
+        )
+    elif service_type == 'hotel':
+        formatted_details = (
+            f"Hotel: {booking_dict.get('hotel')}, "
+            f"City: {booking_dict.get('city')}, "
+            f"Check-in: {booking_dict.get('checkin_date')}, "
+            f"Check-out: {booking_dict.get('checkout_date')}, "
+            f"Room Type: {booking_dict.get('room_type')}, "
+            f"Payment: {booking_dict.get('payment_method')}"
+        )
+    elif service_type == 'car':
+        formatted_details = (
+            f"Car: {booking_dict.get('car')}, "
+            f"City: {booking_dict.get('city')}, "
+            f"Pick-up: {booking_dict.get('pickup_date')}, "
+            f"Drop-off: {booking_dict.get('dropoff_date')}, "
+            f"Payment: {booking_dict.get('payment_method')}"
+        )
+    return formatted_details
+
 # Travel History and Cancellation Function
 def travel_history():
     st.header("Travel History")
@@ -346,47 +351,35 @@ def travel_history():
         st.error("User email is not available. Please log in.")
         return
 
+    # Optional filters, applied in SQL to both the history and the cancellable bookings
+    filters = {}
+    with st.expander("Filter bookings"):
+        service_filter = st.selectbox("Service", ["All", "Flight", "Hotel", "Car"], key="history_service")
+        city_filter = st.selectbox("City", ["All", "Mumbai", "Delhi", "Bangalore", "Hyderabad", "Chennai", "Kolkata", "Pune", "Jaipur"], key="history_city")
+        if service_filter != "All":
+            filters["service_type"] = service_filter.lower()
+        if city_filter != "All":
+            filters["city"] = city_filter
+        if st.checkbox("Filter by travel dates", key="history_dates"):
+            travel_from = st.date_input("Travelling from", value=datetime.now().date(), key="history_from")
+            travel_to = st.date_input("Travelling until", value=datetime.now().date() + timedelta(days=30), min_value=travel_from, key="history_to")
+            filters["travel_from"] = travel_from.strftime('%Y-%m-%d')
+            filters["travel_to"] = travel_to.strftime('%Y-%m-%d')
+
     # Active bookings table
     st.subheader("Active Bookings")
     user_email = st.session_state['email']  # Use logged-in user's email
-    history = fetch_booking_history(user_email, canceled=0)
+    history = fetch_booking_history(user_email, canceled=0, **filters)
     if history:
+        # Bookings still inside their cancellation window, from one indexed query with the same filters
+        cancelable_bookings = fetch_cancellable_bookings(user_email, **filters)
+        cancelable_ids = {booking_id for booking_id, _, _ in cancelable_bookings}
         active_data = []
-        cancelable_bookings = []
-        for idx, record in enumerate(history):
-            booking_id, service_type, details, booking_date = record
-            booking_dict = eval(details)
-            eligible_for_cancellation = "Yes" if is_within_24_hours(booking_dict.get("booking_datetime", "")) else "No"
-            
-            # Extract relevant details from the dictionary and format it
-            if service_type == 'flight':
-                formatted_details = (
-                    f"Source: {booking_dict.get('source')}, "
-                    f"Destination: {booking_dict.get('destination')}, "
-                    f"Departure: {booking_dict.get('departure_date')}, "
-                    f"Return: {booking_dict.get('return_date')}, "
-                    f"Class: {booking_dict.get('travel_class')}, "
-                    f"Flight: {booking_dict.get('selected_flight')}, "
-                    f"Payment: {booking_dict.get('payment_method')}"
-                )
-            elif service_type == 'hotel':
-                formatted_details = (
-                    f"Hotel: {booking_dict.get('hotel')}, "
-                    f"City: {booking_dict.get('city')}, "
-                    f"Check-in: {booking_dict.get('checkin_date')}, "
-                    f"Check-out: {booking_dict.get('checkout_date')}, "
-                    f"Room Type: {booking_dict.get('room_type')}, "
-                    f"Payment: {booking_dict.get('payment_method')}"
-                )
-            elif service_type == 'car':
-                formatted_details = (
-                    f"Car: {booking_dict.get('car')}, "
-                    f"City: {booking_dict.get('city')}, "
-                    f"Pick-up: {booking_dict.get('pickup_date')}, "
-                    f"Drop-off: {booking_dict.get('dropoff_date')}, "
-                    f"Payment: {booking_dict.get('payment_method')}"
-                )
-            
+        for record in history:
+            booking_id, service_type, booking_dict, booking_date = record  # Details come back decoded from JSON
+            eligible_for_cancellation = "Yes" if booking_id in cancelable_ids else "No"
+            formatted_details = format_booking_details(service_type, booking_dict)
+
             active_data.append({
                 "Booking ID": booking_id,
                 "Service": service_type.capitalize(),
@@ -394,28 +387,23 @@ def travel_history():
                 "Booked On": booking_date,
                 "Eligible for Cancellation": eligible_for_cancellation
             })
-            
-            # Collect eligible bookings for the dropdown
-            if eligible_for_cancellation == "Yes":
-                cancelable_bookings.append((idx, booking_id))  # Store index for reference
 
         # Display the table of active bookings
         st.table(pd.DataFrame(active_data, columns=["Booking ID", "Service", "Details", "Booked On", "Eligible for Cancellation"]))
 
         # Dropdown for cancelable bookings
         if cancelable_bookings:
-            cancel_option = st.selectbox(
-                "Select a booking to cancel", 
-                [f"{active_data[idx]['Service']} booking ID: {active_data[idx]['Booking ID']}" for idx, _ in cancelable_bookings]
-            )
-            
-            # Extract the index of the selected option
-            cancel_index = next(i for i, opt in enumerate(cancelable_bookings) if f"{active_data[opt[0]]['Service']} booking ID: {active_data[opt[0]]['Booking ID']}" == cancel_option)
-            
+            cancel_options = [f"{service_type.capitalize()} booking ID: {booking_id} (cancel by {datetime.fromtimestamp(deadline).strftime('%Y-%m-%d %H:%M')})"
+                              for booking_id, service_type, deadline in cancelable_bookings]
+            cancel_option = st.selectbox("Select a booking to cancel", cancel_options)
+            cancel_id = cancelable_bookings[cancel_options.index(cancel_option)][0]
+
             # Button to confirm cancellation
             if st.button("Confirm Cancellation"):
-                cancel_booking(cancelable_bookings[cancel_index][1], user_email)  # Pass the user_email to cancel_booking
-                st.success(f"Booking ID: {cancelable_bookings[cancel_index][1]} canceled.")
+                if cancel_booking(cancel_id, user_email):  # Pass the user_email to cancel_booking
+                    st.success(f"Booking ID: {cancel_id} canceled.")
+                else:
+                    st.error(f"Booking ID: {cancel_id} is no longer eligible for cancellation.")
                 st.stop()  # Stop script execution, re-render on next user interaction
         else:
             st.write("No bookings eligible for cancellation.")
@@ -425,39 +413,12 @@ def travel_history():
 
     # Canceled bookings table
     st.subheader("Canceled Bookings")
-    canceled_history = fetch_booking_history(user_email, canceled=1)
+    canceled_history = fetch_booking_history(user_email, canceled=1, **filters)
     if canceled_history:
         canceled_data = []
         for record in canceled_history:
             booking_id, service_type, details, booking_date = record
-            booking_dict = eval(details)
-            if service_type == 'flight':
-                formatted_details = (
-                    f"Source: {booking_dict.get('source')}, "
-                    f"Destination: {booking_dict.get('destination')}, "
-                    f"Departure: {booking_dict.get('departure_date')}, "
-                    f"Return: {booking_dict.get('return_date')}, "
-                    f"Class: {booking_dict.get('travel_class')}, "
-                    f"Flight: {booking_dict.get('selected_flight')}, "
-                    f"Payment: {booking_dict.get('payment_method')}"
-                )
-            elif service_type == 'hotel':
-                formatted_details = (
-                    f"Hotel: {booking_dict.get('hotel')}, "
-                    f"City: {booking_dict.get('city')}, "
-                    f"Check-in: {booking_dict.get('checkin_date')}, "
-                    f"Check-out: {booking_dict.get('checkout_date')}, "
-                    f"Room Type: {booking_dict.get('room_type')}, "
-                    f"Payment: {booking_dict.get('payment_method')}"
-                )
-            elif service_type == 'car':
-                formatted_details = (
-                    f"Car: {booking_dict.get('car')}, "
-                    f"City: {booking_dict.get('city')}, "
-                    f"Pick-up: {booking_dict.get('pickup_date')}, "
-                    f"Drop-off: {booking_dict.get('dropoff_date')}, "
-                    f"Payment: {booking_dict.get('payment_method')}"
-                )
+            formatted_details = format_booking_details(service_type, details)
             canceled_data.append({
                 "Booking ID": booking_id,
                 "Service": service_type.capitalize(),
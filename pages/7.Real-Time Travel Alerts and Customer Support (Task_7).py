@@ -3,7 +3,8 @@ import time
 import logging
 import os
 import login_signup
-from utils import get_flight_updates, get_customer_support, get_amadeus_token
+from utils import get_customer_support, get_amadeus_token
+from travel_async import get_flight_updates_for_airports, FLIGHT_UPDATES_UNAVAILABLE
 from datetime import date
 
 # Predefined cities and their airport codes
@@ -73,40 +74,31 @@ else:
 
         try:
             # Fetch flight updates for source and destination airports on the selected date
-            num_delayed_source, num_gate_changes_source, delayed_flights_source, gate_changes_source = get_flight_updates(source_airport_code, travel_date)
-            num_delayed_destination, num_gate_changes_destination, delayed_flights_destination, gate_changes_destination = get_flight_updates(destination_airport_code, travel_date)
-
-            # Debugging: Print fetched data for source and destination
-            st.text(f"Source ({source_city}) on {travel_date}: Delayed Flights: {num_delayed_source}, Gate Changes: {num_gate_changes_source}")
-            st.text(f"Destination ({destination_city}) on {travel_date}: Delayed Flights: {num_delayed_destination}, Gate Changes: {num_gate_changes_destination}")
-
-            # Display results for source airport
-            st.subheader(f"Flight Updates for {source_city} ({source_airport_code}) on {travel_date}")
-            if num_delayed_source > 0:
-                st.success(f"{num_delayed_source} flights have delays at {source_city} airport.")
-                for flight in delayed_flights_source:
-                    st.write(f"Flight {flight['flightNumber']} - Delay: {flight['delay']}, Gate Change: {flight.get('gateChange', 'None')}")
-            else:
-                st.info(f"No flight delays found for {source_city} airport on {travel_date}.")
-
-            if num_gate_changes_source > 0:
-                st.success(f"{num_gate_changes_source} flights have gate changes at {source_city} airport.")
-            else:
-                st.info(f"No gate changes found for {source_city} airport.")
-
-            # Display results for destination airport
-            st.subheader(f"Flight Updates for {destination_city} ({destination_airport_code}) on {travel_date}")
-            if num_delayed_destination > 0:
-                st.success(f"{num_delayed_destination} flights have delays at {destination_city} airport.")
-                for flight in delayed_flights_destination:
-                    st.write(f"Flight {flight['flightNumber']} - Delay: {flight['delay']}, Gate Change: {flight.get('gateChange', 'None')}")
-            else:
-                st.info(f"No flight delays found for {destination_city} airport on {travel_date}.")
-
-            if num_gate_changes_destination > 0:
-                st.success(f"{num_gate_changes_destination} flights have gate changes at {destination_city} airport.")
-            else:
-                st.info(f"No gate changes found for {destination_city} airport.")
+            airports = [(source_city, source_airport_code), (destination_city, destination_airport_code)]
+            all_updates = get_flight_updates_for_airports([code for _, code in airports], travel_date)
+
+            for (city, airport_code), updates in zip(airports, all_updates):
+                st.subheader(f"Flight Updates for {city} ({airport_code}) on {travel_date}")
+                # An airport that did not answer in time is not the same as one with no disruptions
+                if updates is FLIGHT_UPDATES_UNAVAILABLE:
+                    st.warning(f"Flight updates for {city} airport are unavailable right now. Please try again later.")
+                    continue
+                num_delayed, num_gate_changes, delayed_flights, gate_changes = updates
+
+                # Debugging: Print fetched data for the airport
+                st.text(f"{city} on {travel_date}: Delayed Flights: {num_delayed}, Gate Changes: {num_gate_changes}")
+
+                if num_delayed > 0:
+                    st.success(f"{num_delayed} flights have delays at {city} airport.")
+                    for flight in delayed_flights:
+                        st.write(f"Flight {flight['flightNumber']} - Delay: {flight['delay']}, Gate Change: {flight.get('gateChange', 'None')}")
+                else:
+                    st.info(f"No flight delays found for {city} airport on {travel_date}.")
+
+                if num_gate_changes > 0:
+                    st.success(f"{num_gate_changes} flights have gate changes at {city} airport.")
+                else:
+                    st.info(f"No gate changes found for {city} airport.")
 
         except Exception as e:
             logging.error(f"Error fetching flight updates: {str(e)}")
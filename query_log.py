@@ -0,0 +1,298 @@
+import sqlite3
+import threading
+import queue
+import atexit
+import time
+
+# Columns written for every logged query, in insert order
+query_log_columns = ("user_email", "user_query", "intent", "locations", "dates")
+
+# Intent categories tracked in the per-user preference profiles
+intent_categories = {
+    "flight": ['flight_booking', 'flight_inquiry', 'flight_cancellation', 'flight_status', 'flight_change'],
+    "hotel": ['hotel_booking', 'hotel_inquiry', 'hotel_cancellation', 'hotel_upgrade', 'hotel_amenities'],
+    "car_rental": ['car_rental', 'car_inquiry', 'car_cancellation', 'car_extension', 'car_price'],
+    "travel_advisory": ['travel_advisory', 'weather_advisory', 'health_advisory', 'political_unrest_advisory', 'covid_restrictions'],
+}
+
+
+# Function to build the SQL expression mapping an intent column to its category
+def _intent_category_sql(intent_column):
+    cases = " ".join(
+        f"WHEN {intent_column} IN ({', '.join(repr(intent) for intent in intents)}) THEN '{category}'"
+        for category, intents in intent_categories.items()
+    )
+    return f"CASE {cases} END"
+
+
+# Function to create the user queries table and the per-user preference profiles kept next to it
+def create_user_queries_table(conn):
+    """
+    user_queries is keyed by user and indexed on (user_email, id). Every insert also
+    bumps a counter in user_query_profile for (user, intent category, locations), so
+    Task 5 reads a handful of profile rows per user however long the query log grows.
+    Older tables without a user_email column are migrated in place.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS user_queries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_query TEXT,
+            intent TEXT,
+            locations TEXT,
+            dates TEXT,
+            user_email TEXT
+        )
+    """)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(user_queries)")]
+    if "user_email" not in columns:
+        conn.execute("ALTER TABLE user_queries ADD COLUMN user_email TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_user_queries_user ON user_queries (user_email, id)")
+
+    profile_exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='user_query_profile'").fetchone()
+    if not profile_exists:
+        conn.execute("""
+            CREATE TABLE user_query_profile (
+                user_email TEXT,
+                intent_category TEXT,
+                location TEXT,
+                query_count INTEGER,
+                last_query_id INTEGER,
+                PRIMARY KEY (user_email, intent_category, location)
+            )
+        """)
+        conn.execute("""
+            CREATE INDEX idx_user_query_profile_top
+            ON user_query_profile (user_email, intent_category, query_count DESC, last_query_id DESC)
+        """)
+        # Backfill from queries logged before the profiles existed
+        conn.execute(f"""
+            INSERT INTO user_query_profile (user_email, intent_category, location, query_count, last_query_id)
+            SELECT user_email, category, locations, COUNT(*), MAX(id)
+            FROM (SELECT user_email, {_intent_category_sql('intent')} AS category, locations, id FROM user_queries)
+            WHERE user_email IS NOT NULL AND category IS NOT NULL AND locations <> ''
+            GROUP BY user_email, category, locations
+        """)
+
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS user_queries_profile_ai AFTER INSERT ON user_queries
+        WHEN NEW.user_email IS NOT NULL AND NEW.locations <> '' AND {_intent_category_sql('NEW.intent')} IS NOT NULL
+        BEGIN
+            INSERT INTO user_query_profile (user_email, intent_category, location, query_count, last_query_id)
+            VALUES (NEW.user_email, {_intent_category_sql('NEW.intent')}, NEW.locations, 1, NEW.id)
+            ON CONFLICT (user_email, intent_category, location)
+            DO UPDATE SET query_count = query_count + 1, last_query_id = excluded.last_query_id;
+        END
+    """)
+    conn.commit()
+
+
+# Function to get a user's most searched locations, one per intent category
+def get_user_top_locations(conn, user_email):
+    """Returns {category: locations string}; ties go to the most recently searched location."""
+    top_locations = {}
+    for category in intent_categories:
+        row = conn.execute("""
+            SELECT location FROM user_query_profile
+            WHERE user_email = ? AND intent_category = ?
+            ORDER BY query_count DESC, last_query_id DESC
+            LIMIT 1
+        """, (user_email, category)).fetchone()
+        top_locations[category] = row[0] if row else None
+    return top_locations
+
+
+class QueryLogWriter:
+    """
+    Write-behind logger for the user_queries table.
+
+    log() only puts the record on a bounded in-memory queue; a background thread
+    writes queued records in one transaction per batch, when `batch_size` records
+    are waiting or `flush_interval` seconds have passed, whichever comes first.
+    When the queue is full, log() waits at most `max_wait` seconds for room
+    (backpressure) and then drops the record rather than stall the page.
+    Anything still queued is written when the process exits.
+    """
+
+    def __init__(self, db_file='travel_chatbot.db', batch_size=100, flush_interval=1.0, max_queue=10000, max_wait=0.05):
+        self.db_file = db_file
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_wait = max_wait
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "logged": 0,
+            "written": 0,
+            "dropped": 0,
+            "flushes": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+            "max_enqueue_ms": 0.0,
+        }
+        self._thread = threading.Thread(target=self._run, name="query-log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # Queue one record (a tuple in query_log_columns order); returns False if it had to be dropped
+    def log(self, record):
+        started = time.perf_counter()
+        try:
+            self._queue.put(record, timeout=self.max_wait)
+            accepted = True
+        except queue.Full:
+            accepted = False
+        enqueue_ms = (time.perf_counter() - started) * 1000
+
+        with self._stats_lock:
+            self._stats["logged" if accepted else "dropped"] += 1
+            self._stats["max_enqueue_ms"] = max(self._stats["max_enqueue_ms"], enqueue_ms)
+        return accepted
+
+    # Snapshot of the writer's counters, including the current queue depth
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["queue_depth"] = self._queue.qsize()
+        stats["avg_flush_ms"] = stats["total_flush_ms"] / stats["flushes"] if stats["flushes"] else 0.0
+        return stats
+
+    # Stop the background thread after writing everything still queued
+    def close(self, timeout=10):
+        if not self._stop.is_set():
+            self._stop.set()
+            self._thread.join(timeout)
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_file)
+        create_user_queries_table(conn)
+        insert_sql = f"INSERT INTO user_queries ({', '.join(query_log_columns)}) VALUES ({', '.join('?' for _ in query_log_columns)})"
+        try:
+            while not (self._stop.is_set() and self._queue.empty()):
+                batch = self._next_batch()
+                if batch:
+                    self._write(conn, insert_sql, batch)
+        finally:
+            conn.close()
+
+    # Wait for the first record, then keep collecting until the batch is full or the interval is up
+    def _next_batch(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or (self._stop.is_set() and self._queue.empty()):
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, conn, insert_sql, batch):
+        started = time.perf_counter()
+        try:
+            with conn:
+                conn.executemany(insert_sql, batch)
+            written, dropped = len(batch), 0
+        except sqlite3.Error as e:
+            print(f"Error writing user queries: {e}")
+            written, dropped = 0, len(batch)
+        flush_ms = (time.perf_counter() - started) * 1000
+
+        with self._stats_lock:
+            self._stats["written"] += written
+            self._stats["dropped"] += dropped
+            self._stats["flushes"] += 1
+            self._stats["last_flush_ms"] = flush_ms
+            self._stats["max_flush_ms"] = max(self._stats["max_flush_ms"], flush_ms)
+            self._stats["total_flush_ms"] += flush_ms
+
+
+# One writer per database file, shared by every session in the process
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+# Function to get the process-wide query log writer for a database file
+def get_query_logger(db_file='travel_chatbot.db'):
+    with _writers_lock:
+        if db_file not in _writers:
+            _writers[db_file] = QueryLogWriter(db_file)
+        return _writers[db_file]
+
+
+# Function to log a chatbot query without waiting for the database
+def log_user_query(user_email, query, intent, locations, dates, db_file='travel_chatbot.db'):
+    return get_query_logger(db_file).log((user_email, query, intent, locations, dates))
+
+
+# Function to compare synchronous per-query commits with the write-behind logger
+def benchmark_query_log(db_file='query_log_benchmark.db', records=2000, threads=8):
+    import os
+
+    for suffix in ("", "-wal", "-journal"):
+        if os.path.exists(db_file + suffix):
+            os.remove(db_file + suffix)
+    record = ("traveller@example.com", "Show me available hotels in Mumbai.", "hotel_inquiry", "Mumbai", "")
+    per_thread = records // threads
+
+    # Synchronous: one INSERT + commit per query, as store_user_query used to do
+    conn = sqlite3.connect(db_file, check_same_thread=False)
+    create_user_queries_table(conn)
+    lock = threading.Lock()
+    latencies = []
+
+    def sync_worker():
+        for _ in range(per_thread):
+            started = time.perf_counter()
+            with lock:
+                conn.execute(f"INSERT INTO user_queries ({', '.join(query_log_columns)}) VALUES (?, ?, ?, ?, ?)", record)
+                conn.commit()
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=sync_worker) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    sync_seconds = time.perf_counter() - started
+    conn.close()
+    latencies.sort()
+    print(f"sync commit:  {records / sync_seconds:>9.0f} queries/s, p50 {latencies[len(latencies) // 2]:.3f} ms, max {latencies[-1]:.3f} ms per query")
+
+    # Write-behind: log() only enqueues
+    writer = QueryLogWriter(db_file)
+    latencies = []
+
+    def async_worker():
+        for _ in range(per_thread):
+            started = time.perf_counter()
+            writer.log(record)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=async_worker) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    enqueue_seconds = time.perf_counter() - started
+    peak_depth = writer.stats()["queue_depth"]
+    writer.close()
+    stats = writer.stats()
+    latencies.sort()
+    print(f"write-behind: {records / enqueue_seconds:>9.0f} queries/s, p50 {latencies[len(latencies) // 2]:.3f} ms, max {latencies[-1]:.3f} ms per query")
+    print(f"              {stats['flushes']} flushes, avg {stats['avg_flush_ms']:.2f} ms, max {stats['max_flush_ms']:.2f} ms, "
+          f"queue depth after enqueue {peak_depth}, written {stats['written']}, dropped {stats['dropped']}")
+
+    for suffix in ("", "-wal", "-journal"):
+        if os.path.exists(db_file + suffix):
+            os.remove(db_file + suffix)
+
+
+# Run the benchmark when executed directly
+if __name__ == "__main__":
+    benchmark_query_log()
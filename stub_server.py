@@ -0,0 +1,282 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+
+import requests
+
+from local_fallback import airline_codes, city_iata_codes, iata_city, flight_offer, hotel_entry, car_entry, car_details
+
+# Real upstreams, by path prefix, used in record mode
+upstream_base_urls = {
+    "/api/ZoomCar/": "https://freeapi.miniprojectideas.com",
+    "/v1/airport/": "https://api.amadeus.com",
+    "/": "https://test.api.amadeus.com",
+}
+
+DEFAULT_PORT = 8765
+
+
+class StubData:
+    """Indexes the synthetic_*.csv files once and builds API-shaped responses from them."""
+
+    def __init__(self, flight_csv="synthetic_flight_data.csv", hotel_csv="synthetic_hotel_data.csv",
+                 car_csv="synthetic_car_rental_data.csv"):
+        self.flights = {}
+        with open(flight_csv, newline="") as f:
+            for row in csv.DictReader(f):
+                self.flights.setdefault((row["Source"], row["Destination"]), []).append(row)
+
+        # Hotel ids are ST + city code + a number, so by-hotels can find the hotel again
+        self.hotels = {}
+        with open(hotel_csv, newline="") as f:
+            for row in csv.DictReader(f):
+                names = self.hotels.setdefault(row["City"], [])
+                if row["Hotel_Name"] not in names:
+                    names.append(row["Hotel_Name"])
+
+        # Car ids are the row number in the CSV
+        self.cars = {}
+        self.cars_by_city = {}
+        with open(car_csv, newline="") as f:
+            for car_id, row in enumerate(csv.DictReader(f), start=1):
+                self.cars[car_id] = row
+                self.cars_by_city.setdefault(row["City"], []).append(car_id)
+
+    def flight_offers(self, query):
+        origin, destination = iata_city(query.get("originLocationCode")), iata_city(query.get("destinationLocationCode"))
+        rows = self.flights.get((origin, destination), [])[:int(query.get("max", 10))]
+        offers = [flight_offer(number, row, query) for number, row in enumerate(rows, start=1)]
+        return {"meta": {"count": len(offers)}, "data": offers}
+
+    def _hotel(self, city, index):
+        return hotel_entry(city, index, self.hotels[city][index])
+
+    def hotels_by_city(self, query):
+        city = iata_city(query.get("cityCode"))
+        hotels = [self._hotel(city, i) for i in range(len(self.hotels.get(city, [])))]
+        return {"data": hotels, "meta": {"count": len(hotels)}}
+
+    def hotels_by_ids(self, query):
+        hotels = []
+        for hotel_id in query.get("hotelIds", "").split(","):
+            city, index = iata_city(hotel_id[2:5]), hotel_id[5:]
+            if city and index.isdigit() and 0 < int(index) <= len(self.hotels.get(city, [])):
+                hotels.append(self._hotel(city, int(index) - 1))
+        return {"data": hotels, "meta": {"count": len(hotels)}}
+
+    def recommended_locations(self, query):
+        codes = query.get("cityCodes", "").split(",")
+        rng = random.Random(query.get("cityCodes"))
+        locations = [
+            {"type": "location", "subType": "CITY", "name": city.upper(), "iataCode": code, "relevance": round(rng.random(), 2)}
+            for city, code in city_iata_codes.items() if code not in codes
+        ]
+        return {"data": sorted(locations, key=lambda location: -location["relevance"])}
+
+    def flight_predictions(self, query):
+        rng = random.Random(f"{query.get('airportCode')}:{query.get('date')}")
+        flights = []
+        for number in range(rng.randint(5, 20)):
+            delay = rng.random() < 0.3
+            gate_change = rng.random() < 0.15
+            flights.append({
+                "flightNumber": f"{rng.choice(list(airline_codes.values()))}{rng.randint(100, 999)}",
+                "delay": f"{rng.randint(10, 120)} min" if delay else None,
+                "gateChange": f"Gate {rng.randint(1, 40)}" if gate_change else None,
+            })
+        return {"flights": flights}
+
+    def search_cars(self, query):
+        car_ids = self.cars_by_city.get(query.get("query"), [])[:25]
+        return {"message": "", "result": True, "data": [car_entry(car_id, self.cars[car_id]) for car_id in car_ids]}
+
+    def car_by_id(self, query):
+        car_id = int(query.get("id", 0)) if str(query.get("id", "")).isdigit() else 0
+        if car_id not in self.cars:
+            return {"message": "Car not found", "result": False, "data": None}
+        car = car_details(car_id, self.cars[car_id])
+        return {"message": "", "result": True, "data": car}
+
+
+# Synthesized GET endpoints: path -> StubData method name
+stub_routes = {
+    "/v2/shopping/flight-offers": "flight_offers",
+    "/v1/reference-data/locations/hotels/by-city": "hotels_by_city",
+    "/v1/reference-data/locations/hotels/by-hotels": "hotels_by_ids",
+    "/v1/reference-data/recommended-locations": "recommended_locations",
+    "/v1/airport/predictions/on-time": "flight_predictions",
+    "/api/ZoomCar/searchCarByLocation": "search_cars",
+    "/api/ZoomCar/GetCarById": "car_by_id",
+}
+
+TOKEN_PATH = "/v1/security/oauth2/token"
+
+
+class StubServer(ThreadingHTTPServer):
+    """
+    Serves the Amadeus and ZoomCar endpoints used by utils.py.
+
+    mode "synth" builds responses from the synthetic CSVs, "replay" serves
+    fixtures recorded earlier (falling back to synth when none matches), and
+    "record" forwards each request to the real upstream and saves the response
+    as a fixture. Every response is delayed by latency_ms +/- jitter_ms, and a
+    fraction error_rate of the API calls is answered with error_status instead.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", DEFAULT_PORT), mode="synth", fixtures_dir="stub_fixtures",
+                 latency_ms=0, jitter_ms=0, error_rate=0.0, error_status=503, data=None):
+        super().__init__(address, StubHandler)
+        self.mode = mode
+        self.fixtures_dir = fixtures_dir
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.data = data if data is not None or mode == "record" else StubData()
+        self._random = random.Random()
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "synthesized": 0, "replayed": 0, "recorded": 0, "errors_injected": 0}
+
+    @property
+    def base_url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def count(self, key):
+        with self._stats_lock:
+            self._stats[key] += 1
+
+    def stats(self):
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def fixture_path(self, method, path, query):
+        key = f"{method} {path}?{json.dumps(sorted(query.items()))}"
+        return os.path.join(self.fixtures_dir, f"{hashlib.sha256(key.encode()).hexdigest()[:32]}.json")
+
+    def delay(self):
+        with self._stats_lock:
+            delay = self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    def inject_error(self):
+        with self._stats_lock:
+            return self.error_rate > 0 and self._random.random() < self.error_rate
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, method):
+        server = self.server
+        server.count("requests")
+        parts = urlsplit(self.path)
+        query = dict(parse_qsl(parts.query))
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        server.delay()
+
+        if parts.path == TOKEN_PATH and server.mode != "record":
+            return self._send(200, {"type": "amadeusOAuth2Token", "access_token": "stub-token", "expires_in": 1799, "token_type": "Bearer"})
+        if server.inject_error():
+            server.count("errors_injected")
+            return self._send(server.error_status, {"errors": [{"status": server.error_status, "title": "INJECTED ERROR"}]})
+
+        if server.mode == "record":
+            return self._record(method, parts, query, body)
+
+        fixture = server.fixture_path(method, parts.path, query)
+        if server.mode == "replay" and os.path.exists(fixture):
+            with open(fixture) as f:
+                recorded = json.load(f)
+            server.count("replayed")
+            return self._send(recorded["status"], recorded["body"])
+
+        route = stub_routes.get(parts.path)
+        if method != "GET" or route is None:
+            return self._send(404, {"errors": [{"status": 404, "title": "NOT FOUND", "detail": parts.path}]})
+        server.count("synthesized")
+        return self._send(200, getattr(server.data, route)(query))
+
+    def _record(self, method, parts, query, body):
+        server = self.server
+        base_url = next(url for prefix, url in upstream_base_urls.items() if parts.path.startswith(prefix))
+        headers = {name: self.headers[name] for name in ("Authorization", "Content-Type") if self.headers.get(name)}
+        try:
+            response = requests.request(method, f"{base_url}{self.path}", headers=headers, data=body or None, timeout=(3.05, 30))
+        except requests.exceptions.RequestException as e:
+            return self._send(502, {"errors": [{"status": 502, "title": "UPSTREAM ERROR", "detail": str(e)}]})
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = {"raw": response.text}
+        # Token responses hold real credentials and are never written to disk
+        if parts.path != TOKEN_PATH:
+            os.makedirs(server.fixtures_dir, exist_ok=True)
+            with open(server.fixture_path(method, parts.path, query), "w") as f:
+                json.dump({"method": method, "path": parts.path, "query": query, "status": response.status_code, "body": payload}, f)
+            server.count("recorded")
+        return self._send(response.status_code, payload)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+
+# Function to start a stub server on a background thread (port 0 picks a free port)
+def start_stub_server(port=0, **options):
+    server = StubServer(("127.0.0.1", port), **options)
+    threading.Thread(target=server.serve_forever, name="stub-server", daemon=True).start()
+    return server
+
+
+# Environment that points utils.py at a running stub server
+def stub_environment(base_url):
+    return {"AMADEUS_BASE_URL": base_url, "AMADEUS_PREDICTIONS_BASE_URL": base_url, "ZOOMCAR_BASE_URL": base_url}
+
+
+# Run the server from the command line: python stub_server.py [--mode replay] [--latency-ms 200] ...
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the Amadeus and ZoomCar APIs.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--mode", choices=["synth", "replay", "record"], default="synth")
+    parser.add_argument("--fixtures-dir", default="stub_fixtures")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    args = parser.parse_args()
+
+    server = StubServer(("127.0.0.1", args.port), mode=args.mode, fixtures_dir=args.fixtures_dir,
+                        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                        error_rate=args.error_rate, error_status=args.error_status)
+    print(f"Serving {args.mode} responses on {server.base_url}; point the app at it with:")
+    for name, value in stub_environment(server.base_url).items():
+        print(f"  export {name}={value}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(server.stats())
@@ -0,0 +1,253 @@
+import csv
+import sqlite3
+import random
+import sys
+import time
+from datetime import date, timedelta
+from itertools import islice
+
+# Cities with relative demand weights; metros get most of the traffic, as in real booking data
+city_weights = {
+    "Mumbai": 24, "Delhi": 22, "Bangalore": 18, "Hyderabad": 10,
+    "Chennai": 9, "Kolkata": 7, "Pune": 6, "Jaipur": 4,
+}
+
+# Value pools matching the shipped synthetic_*.csv files, with weights where real data would be skewed
+airline_weights = {"IndiGo": 35, "Air India": 20, "Vistara": 14, "SpiceJet": 12, "AirAsia": 9, "GoAir": 6, "Alliance Air": 4}
+stop_weights = {"non-stop": 40, "1 stop": 35, "2 stops": 18, "3 stops": 7}
+stop_weights_index = {stops: i for i, stops in enumerate(stop_weights)}
+flight_info = ["No Info", "In-flight meal not included", "No check-in baggage included"]
+hotel_names = ["City Inn", "Comfort Stay", "Hotel Grand", "Mountain Lodge", "Ocean View", "Royal Palace", "The Luxe"]
+room_type_weights = {"Double": 35, "Single": 30, "Deluxe": 25, "Suite": 10}
+hotel_info = ["Airport Shuttle", "Breakfast Included", "Free Wi-Fi", "No Info", "Pool Access Included"]
+car_companies = ["Avis", "Carzonrent", "Drivezy", "Hertz", "Myles", "Ola Rentals", "ZoomCar"]
+car_type_weights = {"Hatchback": 35, "Sedan": 30, "SUV": 20, "Luxury": 10, "Convertible": 5}
+car_info = ["Child Seat Available", "GPS Included", "Insurance Included", "No Info", "Unlimited Miles"]
+advisory_level_weights = {"Low": 45, "Moderate": 30, "High": 17, "Severe": 8}
+advisory_reasons = ["Health advisory", "Infrastructure issues", "Political unrest", "Security concerns", "Weather"]
+advisory_info = ["Avoid non-essential travel", "Check with airlines", "Follow local guidelines", "Monitor local news", "No Info"]
+advisory_validity = ["1 day", "3 days", "1 week", "Indefinite"]
+recommendation_intents = ["flight_booking", "hotel_booking", "car_rental", "travel_advisory"]
+
+# The recommendation file only has specific advice for the "Delhi, Mumbai" pair
+default_recommendation = "No specific recommendation for this route."
+route_recommendations = {
+    ("Delhi, Mumbai", "flight_booking"): "We recommend exploring flights to Jaipur for a change! Explore the Amber Fort and City Palace.",
+    ("Delhi, Mumbai", "hotel_booking"): "Upgrade your stay in Mumbai to a 5-star hotel with rooftop dining. Enjoy the views of the Arabian Sea at the Taj Mahal Palace.",
+    ("Delhi, Mumbai", "car_rental"): "Rent luxury SUVs in Mumbai or try budget-friendly sedans in Delhi! Don’t miss visiting the Gateway of India and India Gate.",
+    ("Delhi, Mumbai", "travel_advisory"): "Weather advisories suggest carrying umbrellas for monsoons in Delhi and Mumbai. Enjoy a cultural tour of Delhi or the Bollywood vibe of Mumbai.",
+}
+
+# Column order of each dataset, as in the shipped CSV files
+dataset_columns = {
+    "flight": ["Airline", "Date_of_Journey", "Source", "Destination", "Dep_Time", "Duration", "Total_Stops", "Additional_Info", "Price", "Arrival_Time"],
+    "hotel": ["Hotel_Name", "City", "Check_In_Date", "Room_Type", "Price_Per_Night", "Availability_Status", "Additional_Info", "Check_Out_Date", "Total_Nights"],
+    "car_rental": ["Car_Rental_Company", "City", "Pickup_Date", "Car_Type", "Price_Per_Day", "Availability_Status", "Additional_Info", "Return_Date", "Total_Days"],
+    "travel_advisory": ["City", "Advisory_Date", "Advisory_Level", "Reason", "Affected_Routes", "Additional_Info", "Validity"],
+    "recommendations": ["User Query", "Intent", "Locations", "Dates", "Recommendation"],
+}
+
+# File each dataset is written to by default
+dataset_files = {
+    "flight": "synthetic_flight_data.csv",
+    "hotel": "synthetic_hotel_data.csv",
+    "car_rental": "synthetic_car_rental_data.csv",
+    "travel_advisory": "synthetic_travel_advisories.csv",
+    "recommendations": "large_user_recommendations.csv",
+}
+
+# Rows buffered per write (and per Parquet row group)
+DEFAULT_CHUNK_SIZE = 50000
+
+
+class _Picker:
+    """Weighted choice from a dict (or uniform from a list) using precomputed cumulative weights."""
+
+    def __init__(self, rng, values):
+        self.rng = rng
+        self.values = list(values)
+        weights = list(values.values()) if isinstance(values, dict) else [1] * len(self.values)
+        self.cum_weights = [sum(weights[:i + 1]) for i in range(len(weights))]
+
+    def __call__(self):
+        return self.rng.choices(self.values, cum_weights=self.cum_weights)[0]
+
+
+def _date_in_range(rng, start, days):
+    return start + timedelta(days=rng.randrange(days))
+
+
+def _flight_rows(rng, start, days):
+    airline, city, stops, info = _Picker(rng, airline_weights), _Picker(rng, city_weights), _Picker(rng, stop_weights), _Picker(rng, flight_info)
+    while True:
+        source = city()
+        destination = city()
+        while destination == source:
+            destination = city()
+        # Longer itineraries with more stops cost more
+        total_stops = stops()
+        minutes = rng.randint(60, 180) + 120 * stop_weights_index[total_stops] + rng.randint(0, 90)
+        departure = rng.randrange(24 * 60)
+        arrival = (departure + minutes) % (24 * 60)
+        price = int(min(15000, max(2000, rng.gauss(6000 + 1500 * stop_weights_index[total_stops], 2500))))
+        yield (airline(), _date_in_range(rng, start, days).isoformat(), source, destination,
+               f"{departure // 60:02d}:{departure % 60:02d}", f"{minutes // 60}h {minutes % 60}m", total_stops, info(),
+               price, f"{arrival // 60:02d}:{arrival % 60:02d}")
+
+
+def _hotel_rows(rng, start, days):
+    city, room_type, info = _Picker(rng, city_weights), _Picker(rng, room_type_weights), _Picker(rng, hotel_info)
+    room_base = {"Single": 4000, "Double": 6500, "Deluxe": 9500, "Suite": 12500}
+    while True:
+        check_in = _date_in_range(rng, start, days)
+        nights = rng.randint(1, 10)
+        room = room_type()
+        price = int(min(15000, max(2000, rng.gauss(room_base[room], 1800))))
+        yield (rng.choice(hotel_names), city(), check_in.isoformat(), room, price,
+               rng.choice(["Available", "Fully Booked"]), info(), (check_in + timedelta(days=nights)).isoformat(), nights)
+
+
+def _car_rental_rows(rng, start, days):
+    city, car_type, info = _Picker(rng, city_weights), _Picker(rng, car_type_weights), _Picker(rng, car_info)
+    type_base = {"Hatchback": 1800, "Sedan": 2600, "SUV": 3400, "Luxury": 4300, "Convertible": 4600}
+    while True:
+        pickup = _date_in_range(rng, start, days)
+        rental_days = rng.randint(1, 15)
+        car = car_type()
+        price = int(min(5000, max(1000, rng.gauss(type_base[car], 500))))
+        yield (rng.choice(car_companies), city(), pickup.isoformat(), car, price,
+               rng.choice(["Available", "Booked"]), info(), (pickup + timedelta(days=rental_days)).isoformat(), rental_days)
+
+
+def _advisory_rows(rng, start, days):
+    city, level, info = _Picker(rng, city_weights), _Picker(rng, advisory_level_weights), _Picker(rng, advisory_info)
+    while True:
+        origin = city()
+        destination = city()
+        while destination == origin:
+            destination = city()
+        yield (city(), _date_in_range(rng, start, days).isoformat(), level(), rng.choice(advisory_reasons),
+               f"{origin} to {destination}", info(), rng.choice(advisory_validity))
+
+
+def _recommendation_rows(rng, start, days):
+    city = _Picker(rng, city_weights)
+    while True:
+        intent = rng.choice(recommendation_intents)
+        locations = f"{city()}, {city()}"
+        yield (f"User is looking for {intent.replace('_', ' ')} in {locations}.", intent, locations,
+               _date_in_range(rng, start, days).isoformat(), route_recommendations.get((locations, intent), default_recommendation))
+
+
+_row_generators = {
+    "flight": _flight_rows,
+    "hotel": _hotel_rows,
+    "car_rental": _car_rental_rows,
+    "travel_advisory": _advisory_rows,
+    "recommendations": _recommendation_rows,
+}
+
+
+# Function to generate rows for one dataset
+def generate_rows(dataset, rows, seed=42, start_date=date(2024, 9, 1), days=366):
+    """
+    Yields `rows` tuples in dataset_columns[dataset] order. The same dataset, seed
+    and date range always produce the same rows; each dataset has its own random
+    stream, so generating one does not change another.
+    """
+    rng = random.Random(f"{seed}:{dataset}")
+    return islice(_row_generators[dataset](rng, start_date, days), rows)
+
+
+# Function to write rows to a CSV file, chunk by chunk
+def write_csv(path, columns, rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    count = 0
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for chunk in iter(lambda: list(islice(rows, chunk_size)), []):
+            writer.writerows(chunk)
+            count += len(chunk)
+    return count
+
+
+# Function to write rows to a Parquet file, one row group per chunk (needs pyarrow)
+def write_parquet(path, columns, rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Writing Parquet requires pyarrow. Install it with: pip install pyarrow") from None
+
+    count = 0
+    writer = None
+    try:
+        for chunk in iter(lambda: list(islice(rows, chunk_size)), []):
+            table = pa.table({column: list(values) for column, values in zip(columns, zip(*chunk))})
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+            count += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+
+# Function to write rows into a SQLite table (created from the column names if missing)
+def write_sqlite(conn, table, columns, rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    quoted = [f'"{column}"' for column in columns]
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(quoted)})")
+    insert_sql = f"INSERT INTO {table} ({', '.join(quoted)}) VALUES ({', '.join('?' for _ in columns)})"
+    count = 0
+    for chunk in iter(lambda: list(islice(rows, chunk_size)), []):
+        conn.executemany(insert_sql, chunk)
+        count += len(chunk)
+    conn.commit()
+    return count
+
+
+# Function to generate datasets and stream them to CSV, Parquet or SQLite
+def generate_datasets(sizes, output_format="csv", output_dir=".", db_file="synthetic_travel.db", seed=42):
+    """
+    `sizes` maps dataset name (see dataset_columns) to a row count. CSV and Parquet
+    files are named as in dataset_files; SQLite tables are named after the dataset.
+    Memory use depends on the chunk size, not on the row counts.
+    """
+    import os
+
+    conn = sqlite3.connect(db_file) if output_format == "sqlite" else None
+    try:
+        for dataset, rows in sizes.items():
+            started = time.perf_counter()
+            generated = generate_rows(dataset, rows, seed)
+            columns = dataset_columns[dataset]
+            if output_format == "csv":
+                target = os.path.join(output_dir, dataset_files[dataset])
+                count = write_csv(target, columns, generated)
+            elif output_format == "parquet":
+                target = os.path.join(output_dir, dataset_files[dataset].replace(".csv", ".parquet"))
+                count = write_parquet(target, columns, generated)
+            elif output_format == "sqlite":
+                target = f"{db_file}:{dataset}"
+                count = write_sqlite(conn, dataset, columns, generated)
+            else:
+                raise ValueError(f"Unknown output format: {output_format}")
+            seconds = time.perf_counter() - started
+            print(f"{dataset}: {count} rows -> {target} in {seconds:.2f}s ({count / seconds if seconds else 0:.0f} rows/s)")
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+# Generate datasets from the command line: python synthetic_data.py ROWS [csv|parquet|sqlite] [output_dir_or_db] [seed]
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    output_format = sys.argv[2] if len(sys.argv) > 2 else "csv"
+    target = sys.argv[3] if len(sys.argv) > 3 else ("synthetic_travel.db" if output_format == "sqlite" else "synthetic_data")
+    seed = int(sys.argv[4]) if len(sys.argv) > 4 else 42
+    if output_format != "sqlite":
+        import os
+        os.makedirs(target, exist_ok=True)
+    generate_datasets({dataset: rows for dataset in dataset_columns}, output_format,
+                      output_dir=target, db_file=target, seed=seed)
@@ -0,0 +1,125 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from api_client import http_client, PRIORITY_INTERACTIVE
+from utils import (
+    amadeus_rate_limiter,
+    get_flight_offers,
+    get_hotel_list_by_city,
+    get_car_rentals,
+    get_hotel_details_by_id,
+    get_hotel_details_by_ids,
+    get_flight_updates,
+)
+
+# Threads the shared event loop may keep busy with blocking upstream calls
+ASYNC_WORKERS = int(os.environ.get("TRAVEL_ASYNC_WORKERS", 16))
+
+# Seconds each service of a trip search may take before it is reported as timed out: one fully
+# retried HTTP call with a full rate limiter wait before every attempt, so a call is not
+# abandoned on its executor thread while the client would still be retrying it
+TRIP_SEARCH_TIMEOUT = http_client.max_request_seconds() + (http_client.retries + 1) * amadeus_rate_limiter.deadlines[PRIORITY_INTERACTIVE]
+
+# What get_flight_updates_for_airports gives for an airport that could not be checked in time
+# (unlike (0, 0, [], []), which means the airport reported no disruptions)
+FLIGHT_UPDATES_UNAVAILABLE = None
+
+_loop = None
+_loop_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=ASYNC_WORKERS, thread_name_prefix="travel-async")
+
+
+# Function to get the process-wide event loop, started on a daemon thread the first time it is needed
+def get_event_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            loop.set_default_executor(_executor)
+            threading.Thread(target=loop.run_forever, name="travel-async-loop", daemon=True).start()
+            _loop = loop
+        return _loop
+
+
+# Function to run a coroutine on the shared loop from synchronous code (e.g. a Streamlit script)
+def run_sync(coro, timeout=None):
+    loop = get_event_loop()
+    if threading.current_thread().name == "travel-async-loop":
+        coro.close()
+        raise RuntimeError("run_sync() cannot be called from the shared event loop; await the coroutine instead.")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+
+async def _call(func, *args):
+    # The upstream functions block on the pooled HTTP client, so they run on the loop's executor
+    return await asyncio.get_running_loop().run_in_executor(None, functools.partial(func, *args))
+
+
+async def _with_timeout(coro, timeout, fallback):
+    try:
+        return await asyncio.wait_for(coro, timeout)
+    except asyncio.TimeoutError:
+        return fallback
+
+
+async def get_flight_offers_async(origin, destination, departure_date, return_date=None):
+    return await _call(get_flight_offers, origin, destination, departure_date, return_date)
+
+
+async def get_hotel_list_by_city_async(city):
+    return await _call(get_hotel_list_by_city, city)
+
+
+async def get_car_rentals_async(city, pickup_date=None, dropoff_date=None):
+    return await _call(get_car_rentals, city, pickup_date, dropoff_date)
+
+
+async def get_hotel_details_by_id_async(hotel_id):
+    return await _call(get_hotel_details_by_id, hotel_id)
+
+
+async def get_hotel_details_by_ids_async(hotel_ids):
+    return await _call(get_hotel_details_by_ids, hotel_ids)
+
+
+async def get_flight_updates_async(airport_code, travel_date):
+    return await _call(get_flight_updates, airport_code, travel_date)
+
+
+# Function to search flights, hotels and car rentals for one trip concurrently
+async def trip_search_async(origin, destination, departure_date, city, return_date=None, timeout=TRIP_SEARCH_TIMEOUT):
+    """
+    Returns {"flights": ..., "hotels": ..., "cars": ...} with each value in the
+    same shape as the matching sync function. A service that does not answer
+    within `timeout` seconds gets {"error": ...} without holding up the others.
+    """
+    def timed_out(service):
+        return {"error": f"{service} search timed out after {timeout}s."}
+
+    flights, hotels, cars = await asyncio.gather(
+        _with_timeout(get_flight_offers_async(origin, destination, departure_date, return_date), timeout, timed_out("Flight")),
+        _with_timeout(get_hotel_list_by_city_async(city), timeout, timed_out("Hotel")),
+        _with_timeout(get_car_rentals_async(city), timeout, timed_out("Car rental")),
+    )
+    return {"flights": flights, "hotels": hotels, "cars": cars}
+
+
+# Function to check flight updates for several airports concurrently, in the order given
+async def get_flight_updates_for_airports_async(airport_codes, travel_date, timeout=TRIP_SEARCH_TIMEOUT):
+    """An airport that does not answer within `timeout` seconds gets FLIGHT_UPDATES_UNAVAILABLE."""
+    return list(await asyncio.gather(*(
+        _with_timeout(get_flight_updates_async(code, travel_date), timeout, FLIGHT_UPDATES_UNAVAILABLE)
+        for code in airport_codes
+    )))
+
+
+# Sync wrappers for the Streamlit pages
+def trip_search(origin, destination, departure_date, city, return_date=None, timeout=TRIP_SEARCH_TIMEOUT):
+    return run_sync(trip_search_async(origin, destination, departure_date, city, return_date, timeout))
+
+
+def get_flight_updates_for_airports(airport_codes, travel_date, timeout=TRIP_SEARCH_TIMEOUT):
+    return run_sync(get_flight_updates_for_airports_async(airport_codes, travel_date, timeout))
@@ -0,0 +1,733 @@
+import sqlite3
+import csv
+import re
+import random
+import time
+from datetime import date, timedelta
+
+# Offset that turns SQLite's julianday() into whole days since 1970-01-01
+JULIAN_UNIX_EPOCH = 2440587.5
+
+# Interval index definitions: (index table, source table, start column, end column)
+interval_indexes = {
+    "hotel": ("hotel_stay_index", "Check_In_Date", "Check_Out_Date"),
+    "car_rental": ("car_rental_period_index", "Pickup_Date", "Return_Date"),
+}
+
+
+# Function to convert a date column or parameter into an integer day number inside SQL
+def _day_expr(value):
+    return f"CAST(julianday({value}) - {JULIAN_UNIX_EPOCH} AS INTEGER)"
+
+
+# Function to create the city code lookup used as the second R*Tree dimension
+def create_city_codes(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS city_code (
+            code INTEGER PRIMARY KEY,
+            city TEXT UNIQUE
+        )
+    """)
+
+
+# Function to look up the integer code of a city (None if the city is unknown)
+def get_city_code(conn, city):
+    row = conn.execute("SELECT code FROM city_code WHERE city = LOWER(?)", (city,)).fetchone()
+    return row[0] if row else None
+
+
+# Function to (re)build the R*Tree interval index for one dataset table
+def build_interval_index(conn, table):
+    """
+    Indexes every row of `table` as a 2-D box (city code x [start day, end day])
+    so that "city = ? AND interval overlaps window" is a single R*Tree lookup.
+    Triggers keep the index in step with later inserts, updates and deletes.
+    """
+    index_table, start_col, end_col = interval_indexes[table]
+    create_city_codes(conn)
+    conn.executescript(f"""
+        DROP TRIGGER IF EXISTS {index_table}_ai;
+        DROP TRIGGER IF EXISTS {index_table}_ad;
+        DROP TRIGGER IF EXISTS {index_table}_au;
+        DROP TABLE IF EXISTS {index_table};
+        CREATE VIRTUAL TABLE {index_table} USING rtree(id, city_lo, city_hi, day_lo, day_hi);
+    """)
+    conn.execute(f"INSERT OR IGNORE INTO city_code (city) SELECT DISTINCT LOWER(City) FROM {table}")
+    conn.execute(f"""
+        INSERT INTO {index_table} (id, city_lo, city_hi, day_lo, day_hi)
+        SELECT t.rowid, c.code, c.code, {_day_expr('t.' + start_col)}, {_day_expr('t.' + end_col)}
+        FROM {table} AS t JOIN city_code AS c ON c.city = LOWER(t.City)
+        WHERE julianday(t.{start_col}) IS NOT NULL AND julianday(t.{end_col}) IS NOT NULL
+    """)
+
+    insert_row = f"""
+            INSERT OR IGNORE INTO city_code (city) VALUES (LOWER(NEW.City));
+            INSERT INTO {index_table} (id, city_lo, city_hi, day_lo, day_hi)
+            SELECT NEW.rowid, code, code, {_day_expr('NEW.' + start_col)}, {_day_expr('NEW.' + end_col)}
+            FROM city_code
+            WHERE city = LOWER(NEW.City)
+              AND julianday(NEW.{start_col}) IS NOT NULL AND julianday(NEW.{end_col}) IS NOT NULL;
+    """
+    conn.executescript(f"""
+        CREATE TRIGGER {index_table}_ai AFTER INSERT ON {table} BEGIN
+            {insert_row}
+        END;
+        CREATE TRIGGER {index_table}_ad AFTER DELETE ON {table} BEGIN
+            DELETE FROM {index_table} WHERE id = OLD.rowid;
+        END;
+        CREATE TRIGGER {index_table}_au AFTER UPDATE ON {table} BEGIN
+            DELETE FROM {index_table} WHERE id = OLD.rowid;
+            {insert_row}
+        END;
+    """)
+    conn.commit()
+
+
+# Function to build the interval indexes for hotels and car rentals
+def build_interval_indexes(conn):
+    for table in interval_indexes:
+        build_interval_index(conn, table)
+    print("Interval indexes built successfully.")
+
+
+# Function to build the interval indexes only when they are missing (e.g. an older database file)
+def ensure_interval_indexes(conn):
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")}
+    for table, (index_table, _, _) in interval_indexes.items():
+        if table in existing and not {index_table, f"{index_table}_ai"} <= existing:
+            build_interval_index(conn, table)
+
+
+# ---- Keyset-paginated queries ----
+
+DEFAULT_PAGE_SIZE = 50
+
+# Columns shown for each dataset table, in display order
+result_columns = {
+    "flight": ["Airline", "Source", "Destination", "Date_of_Journey", "Dep_Time", "Duration", "Total_Stops", "Price", "Additional_Info", "Arrival_Time"],
+    "hotel": ["Hotel_Name", "City", "Check_In_Date", "Room_Type", "Price_Per_Night", "Availability_Status", "Additional_Info", "Check_Out_Date", "Total_Nights"],
+    "car_rental": ["Car_Rental_Company", "City", "Pickup_Date", "Car_Type", "Price_Per_Day", "Availability_Status", "Additional_Info", "Return_Date", "Total_Days"],
+    "travel_advisory": ["City", "Advisory_Date", "Advisory_Level", "Reason", "Affected_Routes", "Additional_Info", "Validity"],
+}
+
+
+class PagedQuery:
+    """
+    A read-only query over one dataset table that is fetched page by page.
+
+    Rows are ordered by a stable integer key (the table rowid), so the next page
+    is "key > last key seen LIMIT n": the cost of a page does not depend on how
+    far the user has paged or how many rows match in total. The object holds no
+    connection, so it can be kept in st.session_state between reruns.
+    """
+
+    def __init__(self, table, conditions=(), params=None, source=None, key="t.rowid",
+                 columns=None, page_size=DEFAULT_PAGE_SIZE):
+        self.table = table
+        self.conditions = list(conditions)
+        self.params = dict(params or {})
+        self.source = source or f"{table} AS t"
+        self.key = key
+        self.columns = columns or result_columns[table]
+        self.page_size = page_size
+
+    def _where(self, after):
+        conditions = list(self.conditions)
+        if after is not None:
+            conditions.append(f"{self.key} > :_after")
+        return " AND ".join(conditions) or "1"
+
+    def _params(self, after, limit=None):
+        params = dict(self.params, _after=after)
+        if limit is not None:
+            params["_limit"] = limit
+        return params
+
+    # Fetch one page of rows after the key `after` (None for the first page)
+    def page(self, conn, after=None):
+        """Returns (rows, next_after); next_after is None on the last page."""
+        select_columns = ", ".join(f't."{col}"' for col in self.columns)
+        cursor = conn.execute(f"""
+            SELECT {self.key}, {select_columns} FROM {self.source}
+            WHERE {self._where(after)}
+            ORDER BY {self.key}
+            LIMIT :_limit
+        """, self._params(after, self.page_size + 1))
+        rows = cursor.fetchall()
+        next_after = rows[self.page_size - 1][0] if len(rows) > self.page_size else None
+        return [row[1:] for row in rows[:self.page_size]], next_after
+
+    # Stream every matching row, one page in memory at a time
+    def iter_rows(self, conn):
+        after = None
+        while True:
+            rows, after = self.page(conn, after)
+            yield from rows
+            if after is None:
+                return
+
+    def all(self, conn):
+        return list(self.iter_rows(conn))
+
+    # Check whether anything matches without fetching a page
+    def exists(self, conn):
+        return conn.execute(f"SELECT 1 FROM {self.source} WHERE {self._where(None)} LIMIT 1", self._params(None)).fetchone() is not None
+
+    # Count matching rows, stopping at `cap` so the estimate stays cheap for broad queries
+    def count_estimate(self, conn, cap=1000):
+        """Returns (count, exact); exact is False when there are more than `cap` rows."""
+        count = conn.execute(f"""
+            SELECT COUNT(*) FROM (
+                SELECT 1 FROM {self.source} WHERE {self._where(None)} LIMIT :_limit
+            )
+        """, self._params(None, cap + 1)).fetchone()[0]
+        return min(count, cap), count <= cap
+
+
+# Function to build a paged query for rows of `table` in `city` whose interval overlaps [start_date, end_date]
+def overlap_query(conn, table, city, start_date=None, end_date=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    A missing start_date or end_date leaves that side of the window open.
+    Each page costs O(log n + k) through the R*Tree instead of a full table scan.
+    """
+    index_table, _, _ = interval_indexes[table]
+    city_code = get_city_code(conn, city)
+    conditions = ["idx.city_lo <= :city", "idx.city_hi >= :city"]
+    if end_date is not None:
+        conditions.append(f"idx.day_lo <= {_day_expr(':end_date')}")
+    if start_date is not None:
+        conditions.append(f"idx.day_hi >= {_day_expr(':start_date')}")
+    return PagedQuery(
+        table,
+        conditions,
+        {"city": -1 if city_code is None else city_code, "start_date": start_date, "end_date": end_date},
+        source=f"{index_table} AS idx JOIN {table} AS t ON t.rowid = idx.id",
+        key="idx.id",
+        page_size=page_size,
+    )
+
+
+# Function to fetch all rows of `table` in `city` whose interval overlaps [start_date, end_date]
+def search_overlapping(conn, table, city, start_date=None, end_date=None):
+    return overlap_query(conn, table, city, start_date, end_date).all(conn)
+
+
+# Function to find hotel stays in a city that overlap the given date window
+def search_hotel_stays(conn, city, start_date=None, end_date=None):
+    return search_overlapping(conn, "hotel", city, start_date, end_date)
+
+
+# Function to find car rentals in a city whose pickup/return period overlaps the given date window
+def search_car_rentals(conn, city, start_date=None, end_date=None):
+    return search_overlapping(conn, "car_rental", city, start_date, end_date)
+
+
+# ---- Full-text search ----
+
+# Free-text columns indexed with FTS5 for each dataset table
+fts_indexes = {
+    "travel_advisory": ["City", "Reason", "Affected_Routes", "Additional_Info"],
+    "flight": ["Additional_Info"],
+    "hotel": ["Additional_Info"],
+}
+
+# Words that carry no meaning for a search over the datasets
+search_stopwords = {
+    "a", "an", "and", "any", "are", "at", "by", "can", "do", "for", "from", "i", "in", "is", "it",
+    "me", "my", "of", "on", "or", "show", "the", "there", "to", "what", "with",
+}
+
+
+# Function to (re)build the FTS5 index of one dataset table
+def build_fts_index(conn, table):
+    """
+    Creates an external-content FTS5 table `<table>_fts` over the free-text columns
+    of `table`. The text itself stays in `table`; triggers keep the index in sync.
+    """
+    fts_table = f"{table}_fts"
+    columns = fts_indexes[table]
+    column_list = ", ".join(columns)
+    new_values = ", ".join(f"NEW.{col}" for col in columns)
+    old_values = ", ".join(f"OLD.{col}" for col in columns)
+    conn.executescript(f"""
+        DROP TRIGGER IF EXISTS {fts_table}_ai;
+        DROP TRIGGER IF EXISTS {fts_table}_ad;
+        DROP TRIGGER IF EXISTS {fts_table}_au;
+        DROP TABLE IF EXISTS {fts_table};
+        CREATE VIRTUAL TABLE {fts_table} USING fts5({column_list}, content='{table}', content_rowid='rowid');
+        INSERT INTO {fts_table} ({fts_table}) VALUES ('rebuild');
+
+        CREATE TRIGGER {fts_table}_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts_table} (rowid, {column_list}) VALUES (NEW.rowid, {new_values});
+        END;
+        CREATE TRIGGER {fts_table}_ad AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts_table} ({fts_table}, rowid, {column_list}) VALUES ('delete', OLD.rowid, {old_values});
+        END;
+        CREATE TRIGGER {fts_table}_au AFTER UPDATE ON {table} BEGIN
+            INSERT INTO {fts_table} ({fts_table}, rowid, {column_list}) VALUES ('delete', OLD.rowid, {old_values});
+            INSERT INTO {fts_table} (rowid, {column_list}) VALUES (NEW.rowid, {new_values});
+        END;
+    """)
+    conn.commit()
+
+
+# Function to build the full-text indexes for advisories, flights and hotels
+def build_fts_indexes(conn):
+    for table in fts_indexes:
+        build_fts_index(conn, table)
+    print("Full-text indexes built successfully.")
+
+
+# Function to build the full-text indexes only when they are missing (e.g. an older database file)
+def ensure_fts_indexes(conn):
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")}
+    for table in fts_indexes:
+        if table in existing and not {f"{table}_fts", f"{table}_fts_ai"} <= existing:
+            build_fts_index(conn, table)
+
+
+# Function to turn a free-text question into an FTS5 MATCH expression (None if nothing is searchable)
+def fts_match_expression(text):
+    """
+    Every remaining word becomes a quoted term and the terms are OR-ed together,
+    so bm25 ranks rows that match more (and rarer) words first.
+    """
+    words = [word for word in re.findall(r"\w+", text.lower()) if word not in search_stopwords]
+    if not words:
+        return None
+    return " OR ".join(f'"{word}"' for word in dict.fromkeys(words))
+
+
+class RankedQuery:
+    """
+    A full-text query over one dataset table, ordered by bm25 relevance.
+
+    Has the same page()/count_estimate()/exists() interface as PagedQuery so the
+    Task 3 result panels can show either. Ranking needs every match anyway, so
+    pages are addressed by offset rather than by key.
+    """
+
+    def __init__(self, table, match, conditions=(), params=None, columns=None, page_size=DEFAULT_PAGE_SIZE):
+        self.table = table
+        self.match = match
+        self.conditions = list(conditions)
+        self.params = dict(params or {})
+        self.columns = columns or result_columns[table]
+        self.page_size = page_size
+
+    def _from_where(self):
+        fts_table = f"{self.table}_fts"
+        conditions = [f"{fts_table} MATCH :_match"] + self.conditions
+        return f"{fts_table} JOIN {self.table} AS t ON t.rowid = {fts_table}.rowid WHERE {' AND '.join(conditions)}"
+
+    def page(self, conn, after=None):
+        """Returns (rows, next_after); `after` is the number of rows already shown."""
+        offset = after or 0
+        select_columns = ", ".join(f't."{col}"' for col in self.columns)
+        rows = conn.execute(f"""
+            SELECT {select_columns} FROM {self._from_where()}
+            ORDER BY bm25({self.table}_fts)
+            LIMIT :_limit OFFSET :_offset
+        """, dict(self.params, _match=self.match, _limit=self.page_size + 1, _offset=offset)).fetchall()
+        next_after = offset + self.page_size if len(rows) > self.page_size else None
+        return rows[:self.page_size], next_after
+
+    def count_estimate(self, conn, cap=1000):
+        count = conn.execute(f"SELECT COUNT(*) FROM (SELECT 1 FROM {self._from_where()} LIMIT :_limit)",
+                             dict(self.params, _match=self.match, _limit=cap + 1)).fetchone()[0]
+        return min(count, cap), count <= cap
+
+    def exists(self, conn):
+        return conn.execute(f"SELECT 1 FROM {self._from_where()} LIMIT 1", dict(self.params, _match=self.match)).fetchone() is not None
+
+
+# Function to build a relevance-ranked full-text query (None if the text has no searchable words)
+def text_search_query(table, text, conditions=(), params=None, page_size=DEFAULT_PAGE_SIZE):
+    match = fts_match_expression(text)
+    if match is None:
+        return None
+    return RankedQuery(table, match, conditions, params, page_size=page_size)
+
+
+# Function to search a dataset table's free text, best matches first
+def search_text(conn, table, text, limit=20):
+    query = text_search_query(table, text, page_size=limit)
+    if query is None:
+        return []
+    rows, _ = query.page(conn)
+    return rows
+
+
+# Function to search travel advisories by city, reason, affected routes and additional info
+def search_advisories(conn, text, limit=20):
+    return search_text(conn, "travel_advisory", text, limit)
+
+
+# ---- Price aggregates ----
+
+# Materialized price statistics: stats table -> (source table, group columns, date column, price column)
+price_aggregates = {
+    "flight_price_stats": ("flight", ["Source", "Destination"], "Date_of_Journey", "Price"),
+    "hotel_price_stats": ("hotel", ["City", "Room_Type"], "Check_In_Date", "Price_Per_Night"),
+    "car_price_stats": ("car_rental", ["City", "Car_Type"], "Pickup_Date", "Price_Per_Day"),
+}
+
+# Percentiles kept for every group (nearest-rank)
+price_percentiles = [50, 90]
+
+
+# Function to build the SQL that recomputes the statistics of every group, or only of the dirty ones
+def _price_stats_refresh_sql(stats_table, dirty_only=False):
+    table, group_cols, date_col, price_col = price_aggregates[stats_table]
+    keys = ", ".join(group_cols)
+    percentile_columns = ", ".join(f"p{p}_price" for p in price_percentiles)
+    percentile_values = ", ".join(f"MAX(CASE WHEN rn = (cnt * {p} + 99) / 100 THEN price END)" for p in price_percentiles)
+    if dirty_only:
+        # Driven from the dirty groups, so each one is read through idx_<table>_price_group
+        key_match = " AND ".join(f"t.{col} = s.{col}" for col in group_cols)
+        source = f"""{stats_table} AS s JOIN {table} AS t
+                ON {key_match} AND t.{date_col} >= s.month || '-01' AND t.{date_col} < s.month || '-99'
+                WHERE s.dirty AND"""
+    else:
+        source = f"{table} AS t WHERE"
+    return f"""
+        INSERT OR REPLACE INTO {stats_table} ({keys}, month, offer_count, min_price, avg_price, price_sum, {percentile_columns}, dirty)
+        SELECT {keys}, month, COUNT(*), MIN(price), AVG(price), SUM(price), {percentile_values}, 0
+        FROM (
+            SELECT {keys}, month, price,
+                   ROW_NUMBER() OVER (PARTITION BY {keys}, month ORDER BY price) AS rn,
+                   COUNT(*) OVER (PARTITION BY {keys}, month) AS cnt
+            FROM (
+                SELECT {", ".join(f"t.{col} AS {col}" for col in group_cols)}, substr(t.{date_col}, 1, 7) AS month, CAST(t.{price_col} AS REAL) AS price
+                FROM {source} t.{price_col} IS NOT NULL AND t.{date_col} IS NOT NULL
+            )
+        )
+        GROUP BY {keys}, month
+    """
+
+
+# Function to build the trigger SQL that adds the NEW row to its group's count, sum and minimum
+def _price_stats_add_row(stats_table):
+    _, group_cols, date_col, price_col = price_aggregates[stats_table]
+    keys = ", ".join(group_cols)
+    price = f"CAST(NEW.{price_col} AS REAL)"
+    return f"""
+            INSERT INTO {stats_table} ({keys}, month, offer_count, min_price, avg_price, price_sum, dirty)
+            SELECT {", ".join(f"NEW.{col}" for col in group_cols)}, substr(NEW.{date_col}, 1, 7), 1, {price}, {price}, {price}, 1
+            WHERE NEW.{price_col} IS NOT NULL AND NEW.{date_col} IS NOT NULL
+            ON CONFLICT ({keys}, month) DO UPDATE SET
+                offer_count = offer_count + 1,
+                min_price = MIN(min_price, excluded.min_price),
+                price_sum = price_sum + excluded.price_sum,
+                avg_price = (price_sum + excluded.price_sum) / (offer_count + 1),
+                dirty = 1;
+    """
+
+
+# Function to build the trigger SQL that takes the OLD row out of its group
+def _price_stats_remove_row(stats_table):
+    """The group's minimum is only looked up again when the removed row held it."""
+    table, group_cols, date_col, price_col = price_aggregates[stats_table]
+    key_match = " AND ".join(f"{col} = OLD.{col}" for col in group_cols)
+    month = f"substr(OLD.{date_col}, 1, 7)"
+    price = f"CAST(OLD.{price_col} AS REAL)"
+    group = f"{key_match} AND month = {month} AND OLD.{price_col} IS NOT NULL AND OLD.{date_col} IS NOT NULL"
+    source_match = " AND ".join(f"{table}.{col} = OLD.{col}" for col in group_cols)
+    return f"""
+            UPDATE {stats_table} SET
+                offer_count = offer_count - 1,
+                price_sum = price_sum - {price},
+                avg_price = (price_sum - {price}) / NULLIF(offer_count - 1, 0),
+                min_price = CASE WHEN min_price < {price} THEN min_price ELSE (
+                    SELECT MIN(CAST({price_col} AS REAL)) FROM {table}
+                    WHERE {source_match} AND {date_col} >= {month} || '-01' AND {date_col} < {month} || '-99'
+                          AND {price_col} IS NOT NULL
+                ) END,
+                dirty = 1
+            WHERE {group};
+            DELETE FROM {stats_table} WHERE {group} AND offer_count <= 0;
+    """
+
+
+# Function to (re)build one materialized price statistics table and the triggers that maintain it
+def build_price_aggregate(conn, stats_table):
+    """
+    One row per (group, month) with offer count, min/avg price and percentiles.
+    After the initial build, triggers on the source table keep the count, sum and
+    minimum up to date for each written row and mark its group dirty; percentiles
+    of dirty groups are recomputed in one batch when they are next read
+    (refresh_price_percentiles).
+    """
+    table, group_cols, date_col, price_col = price_aggregates[stats_table]
+    key_columns = ", ".join(f"{col} TEXT COLLATE NOCASE" for col in group_cols)
+    percentile_columns = ", ".join(f"p{p}_price REAL" for p in price_percentiles)
+    keys = ", ".join(group_cols)
+    conn.executescript(f"""
+        DROP TRIGGER IF EXISTS {stats_table}_ai;
+        DROP TRIGGER IF EXISTS {stats_table}_ad;
+        DROP TRIGGER IF EXISTS {stats_table}_au;
+        DROP TABLE IF EXISTS {stats_table};
+        CREATE TABLE {stats_table} (
+            {key_columns},
+            month TEXT,
+            offer_count INTEGER,
+            min_price REAL,
+            avg_price REAL,
+            price_sum REAL,
+            {percentile_columns},
+            dirty INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY ({keys}, month)
+        );
+        CREATE INDEX {stats_table}_dirty ON {stats_table} (dirty) WHERE dirty;
+        CREATE INDEX IF NOT EXISTS idx_{table}_price_group ON {table} ({keys}, {date_col});
+    """)
+    conn.execute(_price_stats_refresh_sql(stats_table))
+    conn.executescript(f"""
+        CREATE TRIGGER {stats_table}_ai AFTER INSERT ON {table} BEGIN
+            {_price_stats_add_row(stats_table)}
+        END;
+        CREATE TRIGGER {stats_table}_ad AFTER DELETE ON {table} BEGIN
+            {_price_stats_remove_row(stats_table)}
+        END;
+        CREATE TRIGGER {stats_table}_au AFTER UPDATE OF {keys}, {date_col}, {price_col} ON {table} BEGIN
+            {_price_stats_remove_row(stats_table)}
+            {_price_stats_add_row(stats_table)}
+        END;
+    """)
+    conn.commit()
+
+
+# Function to recompute the percentiles of every group written to since they were last computed
+def refresh_price_percentiles(conn, stats_table):
+    if conn.execute(f"SELECT 1 FROM {stats_table} WHERE dirty LIMIT 1").fetchone() is None:
+        return
+    conn.execute(_price_stats_refresh_sql(stats_table, dirty_only=True))
+    conn.commit()
+
+
+# Function to build all materialized price statistics tables
+def build_price_aggregates(conn):
+    for stats_table in price_aggregates:
+        build_price_aggregate(conn, stats_table)
+    print("Price aggregates built successfully.")
+
+
+# Function to build the price statistics only when they are missing (e.g. an older database file)
+def ensure_price_aggregates(conn):
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger', 'index')")}
+    for stats_table, (table, _, _, _) in price_aggregates.items():
+        # Tables from before the dirty flag have whole-group refresh triggers and are rebuilt too
+        if table in existing and not {stats_table, f"{stats_table}_ai", f"{stats_table}_dirty"} <= existing:
+            build_price_aggregate(conn, stats_table)
+
+
+# Function to summarise prices for a group, optionally for one month ('YYYY-MM', or 1-12 for that month in any year)
+def get_price_summary(conn, stats_table, keys, month=None):
+    """
+    `keys` maps group columns to values, e.g. {"Source": "Delhi", "Destination": "Mumbai"};
+    columns left out are summed over (e.g. every room type in a city).
+    Returns a dict with offers, min_price, avg_price and, when the summary covers
+    a single stored group-month, its percentiles; None if nothing matches.
+    """
+    refresh_price_percentiles(conn, stats_table)
+    conditions = [f"{col} = ?" for col in keys]
+    params = list(keys.values())
+    if isinstance(month, int):
+        conditions.append("substr(month, 6, 2) = ?")
+        params.append(f"{month:02d}")
+    elif month:
+        conditions.append("month = ?")
+        params.append(month)
+
+    rows = conn.execute(f"""
+        SELECT offer_count, min_price, price_sum, {', '.join(f'p{p}_price' for p in price_percentiles)}
+        FROM {stats_table} WHERE {' AND '.join(conditions) or '1'}
+    """, params).fetchall()
+    if not rows:
+        return None
+
+    offers = sum(row[0] for row in rows)
+    summary = {
+        "offers": offers,
+        "min_price": min(row[1] for row in rows),
+        "avg_price": sum(row[2] for row in rows) / offers,
+    }
+    for i, p in enumerate(price_percentiles):
+        summary[f"p{p}_price"] = rows[0][3 + i] if len(rows) == 1 else None
+    return summary
+
+
+# Function to answer a price question for a chatbot category from the materialized statistics
+def describe_prices(conn, category, locations, month=None, item_type=None):
+    """Returns a one-line answer, or None if the statistics cannot answer it."""
+    if category == "flight" and len(locations) >= 2:
+        stats_table, keys, label, unit = "flight_price_stats", {"Source": locations[0], "Destination": locations[1]}, f"flights {locations[0]} → {locations[1]}", ""
+    elif category == "hotel" and locations:
+        stats_table, keys, label, unit = "hotel_price_stats", {"City": locations[0]}, f"hotels in {locations[0]}", " per night"
+        if item_type:
+            keys["Room_Type"] = item_type
+    elif category == "car_rental" and locations:
+        stats_table, keys, label, unit = "car_price_stats", {"City": locations[0]}, f"car rentals in {locations[0]}", " per day"
+        if item_type:
+            keys["Car_Type"] = item_type
+    else:
+        return None
+
+    summary = get_price_summary(conn, stats_table, keys, month)
+    if summary is None:
+        return None
+    if item_type:
+        label = f"{item_type} {label}"
+    answer = (f"Prices for {label}: cheapest ₹{summary['min_price']:,.0f}{unit}, "
+              f"average ₹{summary['avg_price']:,.0f}{unit} across {summary['offers']} offers")
+    if summary["p90_price"] is not None:
+        answer += f" (median ₹{summary['p50_price']:,.0f}, 90th percentile ₹{summary['p90_price']:,.0f})"
+    return answer + "."
+
+
+# Words that mark a chatbot question as being about prices
+price_question_words = {"price", "prices", "cost", "costs", "cheapest", "cheap", "average", "rate", "rates", "fare", "fares", "much"}
+
+
+# Function to answer a free-text price question ("cheapest flight Delhi to Mumbai in October") from the statistics
+def answer_price_question(conn, category, text, locations, month=None):
+    """Returns None when the text is not a price question or the statistics cannot answer it."""
+    words = set(re.findall(r"\w+", text.lower()))
+    if not words & price_question_words:
+        return None
+
+    # Room or car type, if the question names one of the types present in the statistics
+    item_type = None
+    type_column = {"hotel": ("hotel_price_stats", "Room_Type"), "car_rental": ("car_price_stats", "Car_Type")}.get(category)
+    if type_column:
+        stats_table, column = type_column
+        for (value,) in conn.execute(f"SELECT DISTINCT {column} FROM {stats_table}"):
+            if value and value.lower() in words:
+                item_type = value
+                break
+    return describe_prices(conn, category, locations, month, item_type)
+
+
+# Function to rebuild every structure derived from one dataset table (interval index, full-text index, price statistics)
+def rebuild_derived_tables(conn, table):
+    """Used after loading rows with the table's triggers dropped; each build recreates its triggers."""
+    if table in interval_indexes:
+        build_interval_index(conn, table)
+    if table in fts_indexes:
+        build_fts_index(conn, table)
+    for stats_table, (source, _, _, _) in price_aggregates.items():
+        if source == table:
+            build_price_aggregate(conn, stats_table)
+
+
+# ---- Benchmark ----
+
+# Function to load a CSV file into a table in a scratch database, replicating it `scale` times
+def _load_scaled_table(conn, table, csv_file, scale, date_columns):
+    with open(csv_file, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = list(reader)
+
+    conn.execute(f"DROP TABLE IF EXISTS {table}")
+    conn.execute(f"CREATE TABLE {table} ({', '.join(header)})")
+    placeholders = ", ".join("?" for _ in header)
+    date_positions = [header.index(col) for col in date_columns]
+
+    # Each copy is shifted by a whole number of weeks so the intervals spread out like real data would
+    rng = random.Random(42)
+    for copy in range(scale):
+        shift = 0 if copy == 0 else rng.randint(-52, 52) * 7
+        batch = []
+        for row in rows:
+            if shift:
+                row = list(row)
+                for pos in date_positions:
+                    row[pos] = _shift_date(row[pos], shift)
+            batch.append(row)
+        conn.executemany(f"INSERT INTO {table} VALUES ({placeholders})", batch)
+    conn.commit()
+
+
+def _shift_date(date_str, days):
+    try:
+        return (date.fromisoformat(date_str) + timedelta(days=days)).isoformat()
+    except ValueError:
+        return date_str
+
+
+# Function to compare the R*Tree interval search against the plain SQL scan at several data sizes
+def benchmark_interval_index(scales=(1, 10, 100), queries=200, window_days=7):
+    sources = {
+        "hotel": ("synthetic_hotel_data.csv", ["Check_In_Date", "Check_Out_Date"],
+                  "SELECT * FROM hotel WHERE LOWER(City)=LOWER(?) AND Check_In_Date<=? AND Check_Out_Date>=?"),
+        "car_rental": ("synthetic_car_rental_data.csv", ["Pickup_Date", "Return_Date"],
+                       "SELECT * FROM car_rental WHERE LOWER(City)=LOWER(?) AND Pickup_Date<=? AND Return_Date>=?"),
+    }
+    cities = ['Mumbai', 'Delhi', 'Bangalore', 'Hyderabad', 'Chennai', 'Kolkata', 'Pune', 'Jaipur']
+    rng = random.Random(7)
+    windows = []
+    for _ in range(queries):
+        start = date(2024, 9, 1) + timedelta(days=rng.randint(0, 480))
+        windows.append((rng.choice(cities), start.isoformat(), (start + timedelta(days=window_days)).isoformat()))
+
+    print(f"{'table':<12}{'scale':>7}{'rows':>11}{'build s':>10}{'scan ms/q':>12}{'index ms/q':>12}{'avg hits':>10}")
+    for scale in scales:
+        conn = sqlite3.connect(":memory:")
+        for table, (csv_file, date_columns, scan_sql) in sources.items():
+            _load_scaled_table(conn, table, csv_file, scale, date_columns)
+            row_count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+            started = time.perf_counter()
+            build_interval_index(conn, table)
+            build_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            for city, start, end in windows:
+                conn.execute(scan_sql, (city, end, start)).fetchall()
+            scan_ms = (time.perf_counter() - started) * 1000 / queries
+
+            hits = 0
+            started = time.perf_counter()
+            for city, start, end in windows:
+                hits += len(search_overlapping(conn, table, city, start, end))
+            index_ms = (time.perf_counter() - started) * 1000 / queries
+
+            print(f"{table:<12}{scale:>7}{row_count:>11}{build_seconds:>10.2f}{scan_ms:>12.2f}{index_ms:>12.2f}{hits / queries:>10.1f}")
+        conn.close()
+
+
+# Function to compare time-to-first-page and peak memory of a paged query against fetchall()
+def benchmark_paged_query(scales=(1, 10, 100)):
+    import tracemalloc
+
+    print(f"{'scale':>7}{'rows':>11}{'fetchall ms':>13}{'fetchall MB':>13}{'page ms':>9}{'page MB':>9}")
+    for scale in scales:
+        conn = sqlite3.connect(":memory:")
+        _load_scaled_table(conn, "hotel", "synthetic_hotel_data.csv", scale, [])
+        row_count = conn.execute("SELECT COUNT(*) FROM hotel").fetchone()[0]
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        conn.execute("SELECT * FROM hotel WHERE LOWER(City)=LOWER(?)", ("Mumbai",)).fetchall()
+        fetchall_ms = (time.perf_counter() - started) * 1000
+        fetchall_mb = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        query = PagedQuery("hotel", ["LOWER(t.City)=LOWER(:city)"], {"city": "Mumbai"})
+        query.page(conn)
+        query.count_estimate(conn)
+        page_ms = (time.perf_counter() - started) * 1000
+        page_mb = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+
+        print(f"{scale:>7}{row_count:>11}{fetchall_ms:>13.1f}{fetchall_mb:>13.2f}{page_ms:>9.1f}{page_mb:>9.2f}")
+        conn.close()
+
+
+# Run the benchmarks when executed directly
+if __name__ == "__main__":
+    benchmark_interval_index()
+    benchmark_paged_query()
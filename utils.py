@@ -218,6 +218,8 @@ def clean_entities(entities):
 import sqlite3
 import os
 import pandas as pd
+from travel_db import build_interval_indexes, build_fts_indexes, build_price_aggregates
+from bulk_load import bulk_load
 
 # Paths to the uploaded CSV files
 car_rental_file = 'synthetic_car_rental_data.csv'
@@ -316,24 +318,18 @@ def create_tables(conn):
 
 # Function to insert data from CSV files into their respective tables
 def insert_data_from_csv(conn):
+    """Streams each CSV into its typed table in fixed-size chunks (see bulk_load.py)."""
     try:
-        # Load CSV files
-        car_rental_data = pd.read_csv(car_rental_file)
-        flight_data = pd.read_csv(flight_file)
-        hotel_data = pd.read_csv(hotel_file)
-        travel_advisories_data = pd.read_csv(advisory_file)
-
-        # Insert data into respective tables
-        car_rental_data.to_sql('car_rental', conn, if_exists='replace', index=False)
-        flight_data.to_sql('flight', conn, if_exists='replace', index=False)
-        hotel_data.to_sql('hotel', conn, if_exists='replace', index=False)
-        travel_advisories_data.to_sql('travel_advisory', conn, if_exists='replace', index=False)
-
-        conn.commit()
+        bulk_load(conn, {
+            'car_rental': car_rental_file,
+            'flight': flight_file,
+            'hotel': hotel_file,
+            'travel_advisory': advisory_file,
+        })
         print("Data inserted successfully!")
         
-    except pd.errors.EmptyDataError:
-        print("CSV file is empty. Please check the file content.")
+    except ValueError as e:
+        print(f"Invalid CSV file: {e}")
     except FileNotFoundError as e:
         print(f"File not found: {e}")
     except sqlite3.Error as e:
@@ -349,6 +345,9 @@ def init_db(db_file='travel_chatbot.db'):
         if conn is not None:
             create_tables(conn)
             insert_data_from_csv(conn)
+            build_interval_indexes(conn)
+            build_fts_indexes(conn)
+            build_price_aggregates(conn)
             print("Database initialized and datasets stored.")
         else:
             print("Error! Cannot create the database connection.")
@@ -357,6 +356,9 @@ def init_db(db_file='travel_chatbot.db'):
         conn = create_connection(db_file)
         create_tables(conn)
         insert_data_from_csv(conn)
+        build_interval_indexes(conn)
+        build_fts_indexes(conn)
+        build_price_aggregates(conn)
 
 # Run the initialization
 if __name__ == "__main__":
@@ -451,47 +453,52 @@ def classify_entities(entities, locations):
 
 
 import os
+import threading
 
 import requests
 import streamlit as st
+from api_cache import get_api_cache
+from api_client import TokenManager, AmadeusAuthError, authorized_request, http_client, fan_out, RateLimiter, request_priority, PRIORITY_BACKGROUND, CircuitBreaker, request_error, upstream_failed
+from local_fallback import fallback_flight_offers, fallback_hotel_list, fallback_hotel_details, fallback_car_rentals
 
 # Access secrets from the "general" section
 amadeus_client_id = st.secrets["general"]["AMADEUS_CLIENT_ID"]
 amadeus_client_secret = st.secrets["general"]["AMADEUS_CLIENT_SECRET"]
 
+# Upstream base URLs; point them at stub_server.py to run without network access
+AMADEUS_BASE_URL = os.environ.get("AMADEUS_BASE_URL", "https://test.api.amadeus.com").rstrip("/")
+AMADEUS_PREDICTIONS_BASE_URL = os.environ.get("AMADEUS_PREDICTIONS_BASE_URL", "https://api.amadeus.com").rstrip("/")
+ZOOMCAR_BASE_URL = os.environ.get("ZOOMCAR_BASE_URL", "https://freeapi.miniprojectideas.com").rstrip("/")
+
+# Shared Amadeus token, cached until shortly before it expires (see api_client.TokenManager)
+amadeus_tokens = TokenManager(f"{AMADEUS_BASE_URL}/v1/security/oauth2/token", amadeus_client_id, amadeus_client_secret)
+
+# Client-side limit shared by all Amadeus calls (the test tier allows 10 calls per second)
+amadeus_rate_limiter = RateLimiter(float(os.environ.get("AMADEUS_RATE_LIMIT", 10)))
+
+# Per-upstream circuit breakers; while one is open, searches are answered from the local tables
+amadeus_breaker = CircuitBreaker("Amadeus")
+zoomcar_breaker = CircuitBreaker("ZoomCar")
+
 # Function to get the Amadeus API token using the global variables
 def get_amadeus_token():
-    
-  
-    auth_url = "https://test.api.amadeus.com/v1/security/oauth2/token"
-    
-    data = {
-        "grant_type": "client_credentials",
-        "client_id": amadeus_client_id,
-        "client_secret": amadeus_client_secret
-    }
-    
-    try:
-        response = requests.post(auth_url, data=data)
-        response.raise_for_status()
-        return response.json()["access_token"]
-    except requests.exceptions.RequestException as e:
-        return {"error": str(e)}
+    """Returns the access token string; raises api_client.AmadeusAuthError if it cannot be obtained."""
+    return amadeus_tokens.get_token()
 
-
-# Function to get flight offers from Amadeus API
-def get_flight_offers(origin, destination, departure_date, return_date=None):
-    access_token = get_amadeus_token()
-    
-    if "error" in access_token:
-        return {"error": access_token["error"]}
-    
-    api_url = "https://test.api.amadeus.com/v2/shopping/flight-offers"
+# Function to send an authenticated, rate-limited GET to the Amadeus API (retries once with a new token on 401)
+def amadeus_get(api_url, params=None):
     headers = {
-        "Authorization": f"Bearer {access_token}",
         "Content-Type": "application/json"
     }
-    
+    return authorized_request(amadeus_tokens, "GET", api_url, headers=headers, params=params, rate_limiter=amadeus_rate_limiter)
+
+
+# Function to get flight offers from Amadeus API (read through the API response cache)
+def get_flight_offers(origin, destination, departure_date, return_date=None):
+    """
+    When Amadeus is failing or slow, offers are built from the local flight
+    table instead and the result is marked "fallback".
+    """
     params = {
         "originLocationCode": origin,
         "destinationLocationCode": destination,
@@ -503,13 +510,21 @@ def get_flight_offers(origin, destination, departure_date, return_date=None):
     
     if return_date:
         params["returnDate"] = return_date
-    
-    try:
-        response = requests.get(api_url, headers=headers, params=params)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        return {"error": str(e)}
+
+    def fetch():
+        api_url = f"{AMADEUS_BASE_URL}/v2/shopping/flight-offers"
+        
+        try:
+            response = amadeus_get(api_url, params=params)
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            return request_error(e)
+
+    return get_api_cache().get_or_fetch(
+        "amadeus/flight-offers", params,
+        lambda: amadeus_breaker.call(fetch, lambda: fallback_flight_offers(params), is_error=upstream_failed),
+    )
     
 
 # IATA Codes for Cities (for Flights and Hotels)
@@ -533,26 +548,24 @@ def get_hotel_list_by_city(city):
     if not city_code:
         return {"error": "Invalid city selection. Please select a valid city."}
     
-    access_token = get_amadeus_token()
-    if "error" in access_token:
-        return {"error": access_token["error"]}
-    
-    api_url = f"https://test.api.amadeus.com/v1/reference-data/locations/hotels/by-city"
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json"
-    }
-    
     params = {
         "cityCode": city_code
     }
-    
-    try:
-        response = requests.get(api_url, headers=headers, params=params)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        return {"error": str(e)}
+
+    def fetch():
+        api_url = f"{AMADEUS_BASE_URL}/v1/reference-data/locations/hotels/by-city"
+        
+        try:
+            response = amadeus_get(api_url, params=params)
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            return request_error(e)
+
+    return get_api_cache().get_or_fetch(
+        "amadeus/hotels/by-city", params,
+        lambda: amadeus_breaker.call(fetch, lambda: fallback_hotel_list(params), is_error=upstream_failed),
+    )
 
 import requests
 
@@ -560,24 +573,102 @@ import requests
 def get_hotel_details_by_id(hotel_id):
     """
     Fetches detailed hotel information using hotelId from the Amadeus API.
+    Hotel details are reference data, read through the API response cache. When
+    Amadeus is failing or slow, the local hotel table answers instead (marked
+    "fallback").
     """
-    access_token = get_amadeus_token()
-    
-    if "error" in access_token:
-        return {"error": access_token["error"]}
-    
-    api_url = f"https://test.api.amadeus.com/v1/reference-data/locations/hotels/by-hotels?hotelIds={hotel_id}"
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json"
-    }
-    
-    try:
-        response = requests.get(api_url, headers=headers)
-        response.raise_for_status()  # Raise exception for 4XX/5XX errors
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        return {"error": str(e)}
+    params = {"hotelIds": hotel_id}
+    return get_api_cache().get_or_fetch("amadeus/hotels/by-hotels", params, lambda: _fetch_hotel_details(params))
+
+
+# Function to send one by-hotels request (one or many comma-separated hotelIds) through the Amadeus breaker
+def _fetch_hotel_details(params):
+    def fetch():
+        api_url = f"{AMADEUS_BASE_URL}/v1/reference-data/locations/hotels/by-hotels"
+
+        try:
+            response = amadeus_get(api_url, params=params)
+            response.raise_for_status()  # Raise exception for 4XX/5XX errors
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            return request_error(e)
+
+    return amadeus_breaker.call(fetch, lambda: fallback_hotel_details(params), is_error=upstream_failed)
+
+
+# Most hotel IDs the by-hotels endpoint accepts in one request
+HOTEL_IDS_PER_REQUEST = 99
+
+# Seconds allowed for all chunk requests of one batch; chunks still running report an error
+HOTEL_DETAILS_DEADLINE = 15
+
+# Function to get hotel details for many hotelIds with one by-hotels request per chunk of IDs
+def get_hotel_details_by_ids(hotel_ids):
+    """
+    Returns {hotel_id: response} where each response has the same shape as
+    get_hotel_details_by_id(hotel_id). IDs already in the API response cache are
+    not requested again (stale ones are refreshed in the background); the rest
+    are fetched HOTEL_IDS_PER_REQUEST at a time, split back per hotel and cached
+    under the same key a single lookup uses. Each chunk request goes through
+    get_or_fetch under its own key, so concurrent batches missing the same
+    hotels share it, and through the Amadeus breaker with the local fallback.
+    """
+    hotel_ids = list(dict.fromkeys(hotel_ids))
+    cache = get_api_cache()
+    details = {}
+    missing = []
+    for hotel_id in hotel_ids:
+        params = {"hotelIds": hotel_id}
+        cached = cache.get("amadeus/hotels/by-hotels", params, refresh=lambda params=params: _fetch_hotel_details(params))
+        if cached is not None:
+            details[hotel_id] = cached
+        else:
+            missing.append(hotel_id)
+
+    def fetch_chunk(chunk):
+        params = {"hotelIds": ",".join(chunk)}
+        return cache.get_or_fetch("amadeus/hotels/by-hotels", params, lambda: _fetch_hotel_details(params))
+
+    # Sorted, so batches missing the same hotels build the same chunks
+    missing.sort()
+    chunks = [missing[i:i + HOTEL_IDS_PER_REQUEST] for i in range(0, len(missing), HOTEL_IDS_PER_REQUEST)]
+    timed_out = {"error": "Hotel details request timed out."}
+    for chunk, result in zip(chunks, fan_out(fetch_chunk, chunks, HOTEL_DETAILS_DEADLINE, default=timed_out)):
+        if "error" in result:
+            details.update((hotel_id, result) for hotel_id in chunk)
+            continue
+        found = {hotel.get("hotelId"): hotel for hotel in result.get("data", [])}
+        for hotel_id in chunk:
+            if hotel_id in found:
+                details[hotel_id] = {"data": [found[hotel_id]], "meta": {"count": 1}}
+                # Fallback results are never cached
+                if result.get("fallback"):
+                    details[hotel_id]["fallback"] = True
+                else:
+                    cache.set("amadeus/hotels/by-hotels", {"hotelIds": hotel_id}, details[hotel_id])
+            else:
+                details[hotel_id] = {"error": f"No details found for hotel {hotel_id}."}
+    return {hotel_id: details[hotel_id] for hotel_id in hotel_ids}
+
+
+# Seconds the startup warm-up waits for all cities' hotel lists
+HOTEL_WARM_UP_DEADLINE = 60
+
+# Function to load every city's hotel list into the API response cache before the first search
+def warm_hotel_cache(cities=None):
+    """Returns the cities whose hotel list is now cached."""
+    cities = list(cities or city_iata_mapping)
+    def warm(city):
+        # Warm-up calls queue behind users' searches for the Amadeus rate limit
+        with request_priority(PRIORITY_BACKGROUND):
+            return get_hotel_list_by_city(city)
+
+    results = fan_out(warm, cities, HOTEL_WARM_UP_DEADLINE)
+    return [city for city, result in zip(cities, results) if result and "error" not in result]
+
+# Warm the hotel lists on a background thread at startup when TRAVEL_WARM_HOTEL_CACHE is set
+if os.environ.get("TRAVEL_WARM_HOTEL_CACHE"):
+    threading.Thread(target=warm_hotel_cache, name="hotel-cache-warm-up", daemon=True).start()
 
 
 
@@ -612,50 +703,79 @@ def get_city_by_location_id(location_id):
     """Maps a given locationId to a city name."""
     return location_id_to_city.get(location_id, "Unknown Location")
 
+# Seconds allowed for all vehicle detail lookups of one car search; later cars show N/A
+VEHICLE_DETAILS_DEADLINE = 5
+
 # Function to get vehicle details (number, price, etc.) by carId
-def get_vehicle_details_by_car_id(car_id):
+def get_vehicle_details_by_car_id(car_id, timeout=None):
     """
     Fetches detailed vehicle information using carId from the ZoomCar API.
+    Details are read through the API response cache per car; failed lookups
+    are not cached, so the next search asks again.
     """
-    api_url = f"https://freeapi.miniprojectideas.com/api/ZoomCar/GetCarById?id={car_id}"
-    
-    try:
-        response = requests.get(api_url)
-        response.raise_for_status()  # Raise exception for 4XX/5XX errors
-        vehicle_data = response.json()  # Get the JSON response
-        if "data" in vehicle_data:
-            return vehicle_data["data"]  # Return the 'data' part
-        else:
-            return {"error": "Unexpected response format."}
-    except requests.exceptions.RequestException as e:
-        return {"error": str(e)}
+    def fetch():
+        api_url = f"{ZOOMCAR_BASE_URL}/api/ZoomCar/GetCarById?id={car_id}"
+
+        try:
+            response = http_client.get(api_url, **({"timeout": timeout} if timeout else {}))
+            response.raise_for_status()  # Raise exception for 4XX/5XX errors
+            vehicle_data = response.json()  # Get the JSON response
+            if "data" in vehicle_data:
+                return vehicle_data["data"]  # Return the 'data' part
+            else:
+                return {"error": "Unexpected response format."}
+        except requests.exceptions.RequestException as e:
+            return {"error": str(e)}
+
+    return get_api_cache().get_or_fetch("zoomcar/car-by-id", {"id": car_id}, fetch)
 
 # Function to get car rentals by city from the ZoomCar API
 def get_car_rentals(city, pickup_date=None, dropoff_date=None):
     """
     Fetches car rental data from the ZoomCar API using the city as the query.
     Maps locationId to the actual city names for display purposes and then fetches vehicle details.
+    The search and each car's details are cached separately, so a failed detail
+    lookup only shows N/A until the next search. When ZoomCar is failing or
+    slow, the search is answered from the local car_rental table (marked
+    "fallback").
     """
-    api_url = f"https://freeapi.miniprojectideas.com/api/ZoomCar/searchCarByLocation?query={city}"
+    car_data = get_api_cache().get_or_fetch(
+        "zoomcar/search-by-location", {"query": city},
+        lambda: zoomcar_breaker.call(lambda: _search_cars(city), lambda: fallback_car_rentals(city), is_error=upstream_failed),
+    )
+    # Fallback results already carry the local table's vehicle numbers and prices
+    if not car_data.get("fallback"):
+        _add_vehicle_details(car_data)
+    return car_data
+
+
+def _search_cars(city):
+    api_url = f"{ZOOMCAR_BASE_URL}/api/ZoomCar/searchCarByLocation?query={city}"
 
     try:
         # Send GET request to the API
-        response = requests.get(api_url)
+        response = http_client.get(api_url)
         response.raise_for_status()  # Raise exception for 4XX/5XX errors
         car_data = response.json()  # Get the JSON response
     except requests.exceptions.RequestException as e:
         # Return an error in case of an exception
-        return {"error": str(e)}
+        return request_error(e)
+    return car_data
+
 
+def _add_vehicle_details(car_data):
     # Process and map locationId to city for each car in the result
     if car_data and car_data.get("result") and car_data.get("data"):
-        for car in car_data["data"]:
+        # Fetch detailed vehicle information for all cars at once, in the order of the results
+        all_details = fan_out(
+            lambda car: get_vehicle_details_by_car_id(car.get("carId"), timeout=VEHICLE_DETAILS_DEADLINE),
+            car_data["data"],
+            VEHICLE_DETAILS_DEADLINE,
+        )
+        for car, vehicle_details in zip(car_data["data"], all_details):
             # Replace the locationId with the actual city name for display purposes
             car["mappedLocation"] = get_city_by_location_id(car.get("locationId", 0))
             
-            # Fetch detailed vehicle information using carId
-            vehicle_details = get_vehicle_details_by_car_id(car.get("carId"))
-            
             # If vehicle details were fetched successfully, add them to the car data
             if vehicle_details and vehicle_details.get("carId"):
                 car["vehicleNumber"] = vehicle_details.get("vehicleNo", "N/A")
@@ -663,8 +783,6 @@ def get_car_rentals(city, pickup_date=None, dropoff_date=None):
             else:
                 car["vehicleNumber"] = "N/A"
                 car["finalPrice"] = "N/A"
-    
-    return car_data
 
 
 mock_db = {
@@ -723,18 +841,8 @@ def get_iata_code(city_name):
 
 # Fetch recommendations from Amadeus API
 def fetch_amadeus_recommendations(city_code, traveler_country_code, destination_country_code=None):
-    token = get_amadeus_token()
-    if not token:
-        st.error("Failed to fetch Amadeus token")
-        return None
-    
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json"
-    }
-    
     # Construct the URL for the API request
-    url = f"https://test.api.amadeus.com/v1/reference-data/recommended-locations?cityCodes={city_code}&travelerCountryCode={traveler_country_code}"
+    url = f"{AMADEUS_BASE_URL}/v1/reference-data/recommended-locations?cityCodes={city_code}&travelerCountryCode={traveler_country_code}"
     
     # Add destination country code if available
     if destination_country_code:
@@ -744,9 +852,12 @@ def fetch_amadeus_recommendations(city_code, traveler_country_code, destination_
     st.write(f"Requesting URL: {url}")
     
     try:
-        response = requests.get(url, headers=headers)
+        response = amadeus_get(url)
         response.raise_for_status()
         return response.json().get('data', [])
+    except AmadeusAuthError:
+        st.error("Failed to fetch Amadeus token")
+        return None
     except requests.exceptions.RequestException as e:
         st.error(f"Error fetching Amadeus recommendations: {e}")
         return None
@@ -757,18 +868,13 @@ from utils import get_amadeus_token  # Assuming you have this function defined a
 
 # Function to fetch flight delay and gate change information
 def get_flight_updates(airport_code, travel_date):
-    token = get_amadeus_token()  # Assuming the function exists
-    if not token:
-        return 0, 0, [], []
-
     # Modify your API call to include the travel date
-    url = f'https://api.amadeus.com/v1/airport/predictions/on-time?airportCode={airport_code}&date={travel_date}&apikey={token}'
-    
-    headers = {
-        "Authorization": f"Bearer {token}"
-    }
+    url = f'{AMADEUS_PREDICTIONS_BASE_URL}/v1/airport/predictions/on-time?airportCode={airport_code}&date={travel_date}'
     
-    response = requests.get(url, headers=headers)
+    try:
+        response = amadeus_get(url)
+    except requests.exceptions.RequestException:
+        return 0, 0, [], []
     if response.status_code == 200:
         flight_data = response.json()
         delayed_flights = []